@@ -0,0 +1,243 @@
+# batch_generate.py
+"""Headless batch generation of drum loops and chord progressions
+
+    python batch_generate.py spec.json [--workers N] [--output-dir DIR]
+
+Example spec ("*" or a missing list means every genre/style/mood):
+
+    {
+      "output_dir": "packs/demo",
+      "seed": 1,
+      "drums": {"genres": ["house"], "styles": "*", "count": 4, "bpms": [118, 122]},
+      "chords": {"genres": "*", "moods": "*", "count": 2}
+    }
+
+"seeds" in a section gives one job per seed instead of "count" derived
+seeds. "bars" sets the drum loop length (default 4); "seconds" renders a
+streamed multi-section arrangement of that length instead of a loop.
+Each job is generated from its seed alone, so running a spec again gives
+the same files; with --output-cache-dir, files made before are copied
+from the output cache instead of rendered again.
+
+No tkinter or pygame is imported; decoded samples are shared with the
+workers through one shared memory block instead of being decoded again
+in every process.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from datasets import registry
+import sample_bank
+import sample_cache
+
+_shared_block = None
+
+def _pick(requested, available):
+    """Resolve a spec list against available keys case-insensitively ("*"/None = all)"""
+    if requested in (None, '*'):
+        return list(available)
+    if isinstance(requested, str):
+        requested = [requested]
+    picked = []
+    for name in requested:
+        key = next((k for k in available if k.lower() == name.lower()), None)
+        if key is None:
+            raise ValueError(f"Unknown name in spec: {name}")
+        picked.append(key)
+    return picked
+
+def _seeds(section, base_seed, offset):
+    if section.get('seeds'):
+        return list(section['seeds'])
+    return [base_seed + offset + i for i in range(section.get('count', 1))]
+
+def _safe(name):
+    return name.replace('/', '-').replace(os.sep, '-').replace(' ', '_')
+
+def expand_jobs(spec, output_dir):
+    """Turn a batch spec into a flat list of job dicts"""
+    base_seed = spec.get('seed', 0)
+    jobs = []
+
+    drums = spec.get('drums')
+    if drums:
+        patterns = registry.drum_patterns()
+        for genre in _pick(drums.get('genres'), patterns):
+            for style in _pick(drums.get('styles'), patterns[genre]):
+                for bpm in drums.get('bpms', [120]):
+                    for seed in _seeds(drums, base_seed, len(jobs)):
+                        name = f"{_safe(genre)}_{_safe(style)}_{bpm}bpm_{seed}.wav"
+                        jobs.append({
+                            'kind': 'drums', 'genre': genre, 'style': style, 'bpm': bpm, 'seed': seed,
+                            'inspired_by': drums.get('inspired_by'),
+                            'bars': drums.get('bars'), 'seconds': drums.get('seconds'),
+                            'path': os.path.join(output_dir, 'drums', _safe(genre), _safe(style), name)
+                        })
+
+    chords = spec.get('chords')
+    if chords:
+        chord_progressions = registry.chord_progressions()
+        for genre in _pick(chords.get('genres'), chord_progressions):
+            for mood in _pick(chords.get('moods'), chord_progressions[genre]):
+                for seed in _seeds(chords, base_seed, len(jobs)):
+                    name = f"{_safe(genre)}_{_safe(mood)}_{seed}.mid"
+                    jobs.append({
+                        'kind': 'chords', 'genre': genre, 'mood': mood, 'seed': seed,
+                        'path': os.path.join(output_dir, 'chords', _safe(genre), _safe(mood), name)
+                    })
+
+    return jobs
+
+def drum_sample_paths(jobs):
+    """Every sample a drum job could pick, so they can be decoded once up front"""
+    from gen_loop import INSTRUMENT_FOLDERS
+    from sample_index import get_index
+
+    paths = []
+    for genre in sorted({job['genre'] for job in jobs if job['kind'] == 'drums'}):
+        for folder in INSTRUMENT_FOLDERS.values():
+            paths.extend(get_index().samples(genre, folder))
+    return paths
+
+def _init_worker(shm_name, index, stem_cache_dir=None, output_cache_dir=None, trace_memory=False):
+    global _shared_block
+    if trace_memory:
+        import stages
+        stages.trace_memory = True
+    if shm_name:
+        _shared_block = sample_cache.attach_shared(shm_name, index)
+    if stem_cache_dir:
+        # Workers share rendered stems through the disk tier
+        from stem_cache import stem_cache
+        stem_cache.enable_disk(stem_cache_dir)
+    if output_cache_dir:
+        from output_cache import output_cache
+        output_cache.enable(output_cache_dir)
+
+def run_job(job):
+    """Worker entry point: render one job, return its manifest entry"""
+    started = time.perf_counter()
+    entry = dict(job)
+    entry['stages'] = []
+    try:
+        if job['kind'] == 'drums' and job['seconds']:
+            from gen_loop import generate_arrangement, sections_for_duration
+            generate_arrangement(job['genre'], job['style'], job['inspired_by'], job['path'],
+                                 sections_for_duration(job['seconds'], job['bpm']), bpm=job['bpm'],
+                                 on_stats=entry['stages'].extend, seed=job['seed'])
+            entry['files'] = [job['path']]
+        elif job['kind'] == 'drums':
+            from gen_loop import generate_drum_loop, LOOP_BARS
+            result = generate_drum_loop(job['genre'], job['style'], job['inspired_by'], job['path'], bpm=job['bpm'],
+                                        on_stats=entry['stages'].extend, bars=job['bars'] or LOOP_BARS, seed=job['seed'])
+            entry['cached'] = result['cached']
+            stems = f"{os.path.splitext(job['path'])[0]}.zip"
+            entry['files'] = [job['path']] + ([stems] if os.path.exists(stems) else [])
+        else:
+            from gen_chords import generate_chord_progression
+            result = generate_chord_progression(job['genre'], job['mood'], job['path'],
+                                                on_stats=entry['stages'].extend, seed=job['seed'])
+            entry['cached'] = result['cached']
+            entry['files'] = [job['path']]
+    except Exception as e:
+        entry['error'] = str(e)
+        entry['files'] = []
+    entry['seconds'] = time.perf_counter() - started
+    return entry
+
+def aggregate_stages(results):
+    """Per kind and stage: how often it ran, total/mean/max seconds and the largest peak memory"""
+    totals = {}
+    for result in results:
+        for entry in result.get('stages', []):
+            stage = totals.setdefault(result['kind'], {}).setdefault(entry['stage'], {
+                'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'max_peak_mb': None
+            })
+            stage['count'] += 1
+            stage['total_seconds'] += entry['seconds']
+            stage['max_seconds'] = max(stage['max_seconds'], entry['seconds'])
+            if entry['peak_mb'] is not None:
+                stage['max_peak_mb'] = max(stage['max_peak_mb'] or 0.0, entry['peak_mb'])
+    for stages in totals.values():
+        for stage in stages.values():
+            stage['mean_seconds'] = stage['total_seconds'] / stage['count']
+    return totals
+
+def run_batch(spec, output_dir, workers=None, stem_cache_dir=None, output_cache_dir=None, trace_memory=False):
+    """Run every job in spec on a process pool and write manifest.json; returns the manifest
+
+    stem_cache_dir turns on the on-disk stem cache shared by the workers,
+    output_cache_dir the cache of finished files (see output_cache.py).
+    trace_memory adds each stage's peak memory to the stats (slower).
+    """
+    jobs = expand_jobs(spec, output_dir)
+    started = time.perf_counter()
+
+    # Samples in the packed bank are shared by the OS page cache already
+    shm, index = None, []
+    paths = [path for path in drum_sample_paths(jobs) if sample_bank.lookup(path) is None]
+    if paths:
+        shm, index = sample_cache.export_shared(paths)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm.name if shm else None, index, stem_cache_dir, output_cache_dir,
+                                           trace_memory)) as pool:
+            results = list(pool.map(run_job, jobs))
+    finally:
+        if shm:
+            shm.close()
+            shm.unlink()
+
+    elapsed = time.perf_counter() - started
+    files = sum(len(r['files']) for r in results)
+    manifest = {
+        'spec': spec,
+        'elapsed_seconds': elapsed,
+        'files': files,
+        'files_per_second': files / elapsed if elapsed else 0.0,
+        'cached_jobs': sum(1 for r in results if r.get('cached')),
+        'stages': aggregate_stages(results),
+        'jobs': results
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-generate drum loops and chord progressions")
+    parser.add_argument('spec', help="path to a JSON batch spec")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--output-dir', default=None, help="overrides output_dir from the spec")
+    parser.add_argument('--stem-cache-dir', default=None, help="keep rendered stems on disk here and reuse them across workers and runs")
+    parser.add_argument('--trace-memory', action='store_true', help="also measure each stage's peak memory (slows generation down)")
+    parser.add_argument('--output-cache-dir', default=None, help="keep finished files here and copy them instead of rendering the same job again")
+    args = parser.parse_args(argv)
+
+    with open(args.spec, 'r') as f:
+        spec = json.load(f)
+    output_dir = args.output_dir or spec.get('output_dir', 'batch_output')
+
+    manifest = run_batch(spec, output_dir, args.workers, args.stem_cache_dir, args.output_cache_dir,
+                         args.trace_memory)
+    failed = [job for job in manifest['jobs'] if 'error' in job]
+    for job in failed:
+        print(f"Failed {job['kind']} {job['genre']}: {job['error']}")
+    print(f"Generated {manifest['files']} files from {len(manifest['jobs']) - len(failed)}/{len(manifest['jobs'])} jobs "
+          f"in {manifest['elapsed_seconds']:.2f}s ({manifest['files_per_second']:.1f} files/sec, "
+          f"{manifest['cached_jobs']} from the output cache)")
+    for kind, stages in manifest['stages'].items():
+        for name, stage in stages.items():
+            peak = f", peak +{stage['max_peak_mb']:.1f} MB" if stage['max_peak_mb'] is not None else ""
+            print(f"  {kind} {name}: {stage['count']}x, mean {stage['mean_seconds'] * 1000:.1f} ms, "
+                  f"max {stage['max_seconds'] * 1000:.1f} ms{peak}")
+    print(f"Manifest written to {os.path.join(output_dir, 'manifest.json')}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
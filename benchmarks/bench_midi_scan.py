@@ -0,0 +1,121 @@
+# bench_midi_scan.py
+"""Compare the raw SMF note-on scanner with the mido path used before it
+
+    python benchmarks/bench_midi_scan.py [--files 10000] [--seed 0]
+
+Builds a synthetic corpus of multi-track MIDI files (running status, meta
+and sysex events, note-offs written as velocity 0 note-ons) in a temporary
+folder, checks both paths produce the same patterns and prints files/sec.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'json-data'))
+
+import mido
+from smf_scan import scan_note_ons, ticks_to_pattern
+
+def _varlen(value):
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+def _track(rng, ticks_per_beat):
+    events = bytearray()
+    events += b'\x00\xff\x03' + _varlen(5) + b'drums'
+    events += b'\x00\xf0' + _varlen(3) + b'\x7e\x7f\xf7'
+    step = ticks_per_beat // 4
+    status = None
+    delta = 0
+    for i in range(64):
+        if rng.random() < 0.35:
+            note = rng.choice((36, 38, 42, 46))
+            for velocity in (rng.randint(1, 127), 0):
+                events += _varlen(delta)
+                if status != 0x99:
+                    events.append(0x99)
+                    status = 0x99
+                events += bytes((note, velocity))
+                delta = step // 2
+            delta = step - step // 2
+        else:
+            delta += step
+    events += _varlen(delta) + b'\xff\x2f\x00'
+    return b'MTrk' + len(events).to_bytes(4, 'big') + bytes(events)
+
+def synthetic_midi(rng):
+    ticks_per_beat = rng.choice((96, 480, 960))
+    tracks = [_track(rng, ticks_per_beat) for _ in range(rng.randint(1, 3))]
+    header = b'MThd' + (6).to_bytes(4, 'big') + (1).to_bytes(2, 'big') + len(tracks).to_bytes(2, 'big') + ticks_per_beat.to_bytes(2, 'big')
+    return header + b''.join(tracks)
+
+def mido_pattern(path):
+    """The previous process_midi, with the tick counter reset per track"""
+    mid = mido.MidiFile(path)
+    note_ticks = []
+    for track in mid.tracks:
+        current_tick = 0
+        for msg in track:
+            current_tick += msg.time
+            if msg.type == 'note_on' and msg.velocity > 0:
+                note_ticks.append(current_tick)
+    return ticks_to_pattern(note_ticks, mid.ticks_per_beat)
+
+def scan_pattern(path):
+    with open(path, 'rb') as f:
+        ticks_per_beat, ticks, _ = scan_note_ons(f.read())
+    return ticks_to_pattern(ticks, ticks_per_beat)
+
+def build_corpus(folder, files, seed=0):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        path = os.path.join(folder, f'{i:05d}.mid')
+        with open(path, 'wb') as f:
+            f.write(synthetic_midi(rng))
+        paths.append(path)
+    return paths
+
+def time_path(fn, paths):
+    started = time.perf_counter()
+    patterns = [fn(path) for path in paths]
+    return time.perf_counter() - started, patterns
+
+def run(files=10000, seed=0):
+    """Time both paths over a synthetic corpus; returns a result dict"""
+    with tempfile.TemporaryDirectory() as folder:
+        paths = build_corpus(folder, files, seed)
+        mido_seconds, expected = time_path(mido_pattern, paths)
+        scan_seconds, patterns = time_path(scan_pattern, paths)
+    mismatches = sum(a != b for a, b in zip(expected, patterns))
+    return {
+        'files': files,
+        'mido_seconds': mido_seconds,
+        'scan_seconds': scan_seconds,
+        'mido_files_per_second': files / mido_seconds,
+        'scan_files_per_second': files / scan_seconds,
+        'speedup': mido_seconds / scan_seconds,
+        'mismatches': mismatches
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the raw MIDI note-on scanner against mido")
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    result = run(args.files, args.seed)
+    print(f"mido: {result['mido_seconds']:.2f}s ({result['mido_files_per_second']:.0f} files/sec)")
+    print(f"scan: {result['scan_seconds']:.2f}s ({result['scan_files_per_second']:.0f} files/sec)")
+    print(f"speedup: {result['speedup']:.1f}x, mismatched patterns: {result['mismatches']}")
+    return 1 if result['mismatches'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+# run_benchmarks.py
+"""Benchmark suite for the generation and ingestion hot paths
+
+    python benchmarks/run_benchmarks.py [--repeat 5] [--only NAME ...]
+                                        [--output results.json] [--compare baseline.json]
+
+Synthetic WAV samples, pattern shards and MIDI files are built offline in a
+temporary folder. Every case runs in its own Python process from the repo
+root, so cold imports are really cold and the peak RSS belongs to that case
+alone. Results (wall time, throughput, peak RSS) are saved as JSON under
+benchmarks/results/. --compare flags cases that got slower than a previous
+result by more than --threshold, and exits with status 1 if any did.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'json-data'))
+
+SAMPLE_FOLDERS = ('kicks', 'snares', 'hi-hats', 'open-hats', 'claps', 'percussions')
+SAMPLE_RATE = 44100
+MIDI_FILES = 500
+SHARDS = 20
+PATTERNS_PER_SHARD = 200
+
+# ---- fixtures ----
+
+def write_sample(path, rng, seconds):
+    """A decaying noise burst, 16-bit stereo"""
+    import numpy as np
+    frames = int(SAMPLE_RATE * seconds)
+    envelope = np.exp(-np.linspace(0, 8, frames))
+    noise = np.random.default_rng(rng.randrange(1 << 30)).uniform(-1, 1, (frames, 2))
+    data = (noise * envelope[:, None] * 0.8 * 32767).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(data.tobytes())
+
+def build_fixtures(folder, seed=0):
+    """Samples for every genre in drum_patterns.json, MIDI files and pattern shards"""
+    from bench_midi_scan import synthetic_midi
+
+    rng = random.Random(seed)
+    with open(os.path.join(REPO_ROOT, 'json-data', 'drum_patterns.json'), 'r') as f:
+        genres = sorted(json.load(f))
+
+    for genre in genres:
+        for sample_folder in SAMPLE_FOLDERS:
+            directory = os.path.join(folder, 'drum_samples', genre, sample_folder)
+            os.makedirs(directory)
+            for i in range(3):
+                write_sample(os.path.join(directory, f'{i}.wav'), rng, rng.uniform(0.1, 0.6))
+
+    midi_dir = os.path.join(folder, 'midi')
+    os.makedirs(midi_dir)
+    for i in range(MIDI_FILES):
+        with open(os.path.join(midi_dir, f'{i:05d}.mid'), 'wb') as f:
+            f.write(synthetic_midi(rng))
+
+    shards_dir = os.path.join(folder, 'shards')
+    os.makedirs(shards_dir)
+    for i in range(SHARDS):
+        genre, style = f'genre{i % 4}', f'style{i}'
+        entries = [
+            {
+                'pattern_id': f'f{genre}_{style}_{n % (PATTERNS_PER_SHARD - 10) + 1}',
+                'inspired_by': f'Artist {rng.randrange(1000)}',
+                **{key: [int(rng.random() < 0.3) for _ in range(64)] for key in ('Kick', 'Snare', 'HiHat', 'Clap')}
+            }
+            for n in range(PATTERNS_PER_SHARD)
+        ]
+        with open(os.path.join(shards_dir, f'{genre}-{style}.json'), 'w') as f:
+            json.dump({genre: {style: entries}}, f, indent=2)
+
+# ---- cases (run inside the child process) ----
+
+def _use_samples(fixtures):
+    import sample_index
+    import sample_ingest
+    sample_ingest.CACHE_DIR = os.path.join(fixtures, 'canonical_samples')
+    sample_index._index = sample_index.SampleIndex(os.path.join(fixtures, 'drum_samples'))
+    return sample_index._index
+
+def _drum_patterns(fixtures):
+    """A patterns dict as select_pattern_and_instruments() returns it"""
+    from gen_loop import INSTRUMENT_FOLDERS
+    import pattern_store
+
+    index = _use_samples(fixtures)
+    genre = sorted(os.listdir(os.path.join(fixtures, 'drum_samples')))[0]
+    patterns = {}
+    for instr, folder in INSTRUMENT_FOLDERS.items():
+        bits = random.getrandbits(pattern_store.STEPS)
+        patterns[instr] = {'lane': pattern_store.make_lane(bits), 'sample': index.samples(genre, folder)[0]}
+    return patterns
+
+def case_create_drum_loop(fixtures, out_dir):
+    from gen_loop import create_drum_loop
+    patterns = _drum_patterns(fixtures)
+    return lambda: create_drum_loop(patterns), 1, 'loops'
+
+def case_create_stems(fixtures, out_dir):
+    from gen_loop import create_stems
+    patterns = _drum_patterns(fixtures)
+    return lambda: create_stems(patterns, out_dir), len(patterns), 'stems'
+
+def case_generate_drum_loop(fixtures, out_dir):
+    from gen_loop import generate_drum_loop
+    from datasets import registry
+    _use_samples(fixtures)
+    genre = sorted(os.listdir(os.path.join(fixtures, 'drum_samples')))[0]
+    genre_key = registry.resolve_drum_genre(genre)
+    style = sorted(registry.drum_patterns()[genre_key])[0]
+    path = os.path.join(out_dir, 'loop.wav')
+    return lambda: generate_drum_loop(genre_key, style, None, path, seed=0), 1, 'loops'
+
+def case_generate_chord_progression(fixtures, out_dir):
+    from gen_chords import generate_chord_progression
+    from datasets import registry
+    progressions = registry.chord_progressions()
+    pairs = [(genre, mood) for genre in sorted(progressions) for mood in sorted(progressions[genre])]
+
+    def run():
+        for genre, mood in pairs:
+            generate_chord_progression(genre, mood, seed=0)
+    return run, len(pairs), 'progressions'
+
+def case_process_midi(fixtures, out_dir):
+    from midi_to_json import process_midi
+    midi_dir = os.path.join(fixtures, 'midi')
+    paths = [os.path.join(midi_dir, name) for name in sorted(os.listdir(midi_dir))]
+
+    def run():
+        for path in paths:
+            process_midi(path)
+    return run, len(paths), 'files'
+
+def case_merge_drum_patterns(fixtures, out_dir):
+    from pathlib import Path
+    from merge_json_data import merge_drum_patterns
+    output = Path(out_dir) / 'drum_patterns.json'
+    state = Path(out_dir) / 'drum_patterns.merge-state.json'
+
+    def run():
+        # From scratch every time, so the shards are really merged
+        if state.exists():
+            state.unlink()
+        merge_drum_patterns(Path(fixtures) / 'shards', output, state)
+    return run, SHARDS * PATTERNS_PER_SHARD, 'patterns'
+
+def _import_case(module):
+    def case(fixtures, out_dir):
+        import importlib
+        return lambda: importlib.import_module(module), 1, 'imports'
+    return case
+
+CASES = {
+    'create_drum_loop': case_create_drum_loop,
+    'create_stems': case_create_stems,
+    'generate_drum_loop': case_generate_drum_loop,
+    'generate_chord_progression': case_generate_chord_progression,
+    'process_midi': case_process_midi,
+    'merge_drum_patterns': case_merge_drum_patterns,
+    'import_katwave': _import_case('katwave'),
+    'import_gen_loop': _import_case('gen_loop'),
+    'import_gen_chords': _import_case('gen_chords'),
+}
+# Cold imports can only be measured once per process
+SINGLE_SHOT = {'import_katwave', 'import_gen_loop', 'import_gen_chords'}
+# Rendering cases start every run with empty sample/stem caches, so they time renders, not cache hits
+COLD_CACHES = {'create_drum_loop', 'create_stems', 'generate_drum_loop'}
+
+def clear_caches():
+    from sample_cache import sample_cache
+    from stem_cache import stem_cache
+    sample_cache.clear()
+    stem_cache.clear()
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_case(name, fixtures, repeat, seed):
+    """Run one case in this process and return its result dict"""
+    import contextlib
+    random.seed(seed)
+    with tempfile.TemporaryDirectory() as out_dir:
+        fn, items, unit = CASES[name](fixtures, out_dir)
+        times = []
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(1 if name in SINGLE_SHOT else repeat):
+                if name in COLD_CACHES:
+                    clear_caches()
+                started = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - started)
+    median = statistics.median(times)
+    return {
+        'runs': len(times),
+        'wall_seconds': median,
+        'min_seconds': min(times),
+        'items': items,
+        'unit': unit,
+        'throughput': items / median if median else None,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+# ---- driver ----
+
+def run_in_child(name, fixtures, repeat, seed):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--case', name, '--fixtures', fixtures,
+         '--repeat', str(repeat), '--seed', str(seed)],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if proc.returncode:
+        lines = (proc.stderr or proc.stdout).strip().splitlines()
+        return {'error': lines[-1] if lines else f'exit status {proc.returncode}'}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def compare(results, baseline, threshold):
+    """Print the change against baseline; returns the names of regressed cases"""
+    regressed = []
+    for name, result in results['cases'].items():
+        old = baseline.get('cases', {}).get(name)
+        if not old or 'error' in old or 'error' in result:
+            continue
+        change = result['wall_seconds'] / old['wall_seconds'] - 1 if old['wall_seconds'] else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressed.append(name)
+        print(f"  {name:<28} {old['wall_seconds'] * 1000:9.1f} ms -> {result['wall_seconds'] * 1000:9.1f} ms ({change:+.1%}){flag}")
+    return regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the generation and ingestion hot paths")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per case (median is reported)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=sorted(CASES), help="run only these cases")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', help="previous results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="slowdown that counts as a regression")
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--fixtures', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.fixtures, args.repeat, args.seed)))
+        return 0
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'cases': {}
+    }
+    with tempfile.TemporaryDirectory() as fixtures:
+        build_fixtures(fixtures, args.seed)
+        for name in args.only or CASES:
+            result = run_in_child(name, fixtures, args.repeat, args.seed)
+            results['cases'][name] = result
+            if 'error' in result:
+                print(f"{name:<28} failed: {result['error']}")
+            else:
+                rss = f"{result['peak_rss_mb']:.0f} MB" if result['peak_rss_mb'] is not None else 'n/a'
+                print(f"{name:<28} {result['wall_seconds'] * 1000:9.1f} ms  "
+                      f"{result['throughput']:10.1f} {result['unit']}/s  peak RSS {rss}")
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare}:")
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,26 +1,19 @@
 # chord_templates.py
 
 import random
-import json
-import os
+from datasets import registry
 
-# Load chord progressions from JSON file
-json_path = os.path.join(os.path.dirname(__file__), "json-data/popular_chords.json")
-
-with open(json_path, "r") as f:
-    chord_progressions = json.load(f)
-
-def get_random_progression(genre, mood):
-    genre = genre.lower()
-    mood = mood.lower()
+# Chord progressions from json-data/popular_chords.json, loaded once by the dataset registry
+chord_progressions = registry.chord_progressions()
 
+def get_random_progression(genre, mood, rng=random):
+    """A progression for genre/mood picked with rng (a random.Random)"""
     # Find matching keys in the JSON data (case-insensitive)
-    genre_key = next((g for g in chord_progressions if g.lower() == genre), None)
+    genre_key, mood_key = registry.resolve_mood(genre, mood)
     if genre_key is None:
-        raise ValueError(f"Genre '{genre}' not found in chord progressions")
+        raise ValueError(f"Genre '{genre.lower()}' not found in chord progressions")
 
-    mood_key = next((m for m in chord_progressions[genre_key] if m.lower() == mood), None)
     if mood_key is None:
-        raise ValueError(f"Mood '{mood}' not found under genre '{genre_key}'")
+        raise ValueError(f"Mood '{mood.lower()}' not found under genre '{genre_key}'")
 
-    return random.choice(chord_progressions[genre_key][mood_key])
+    return rng.choice(chord_progressions[genre_key][mood_key])
@@ -0,0 +1,146 @@
+# chord_voicings.py
+import json
+import os
+import re
+import threading
+
+CHORDS_JSON = os.path.join(os.path.dirname(__file__), 'json-data', 'popular_chords.json')
+VOICINGS_JSON = os.path.join(os.path.dirname(__file__), 'json-data', 'chord_voicings.json')
+TABLE_VERSION = 1
+
+# Root is voiced in octave 3 (C3 = MIDI 48), same register music21 uses for ChordSymbol
+ROOT_OCTAVE_BASE = 48
+
+PITCH_CLASSES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+
+# Chord kinds as semitone intervals above the root
+CHORD_INTERVALS = {
+    '': (0, 4, 7), 'M': (0, 4, 7), 'maj': (0, 4, 7),
+    'm': (0, 3, 7), 'min': (0, 3, 7),
+    'dim': (0, 3, 6), 'o': (0, 3, 6),
+    'aug': (0, 4, 8), '+': (0, 4, 8),
+    'sus2': (0, 2, 7), 'sus4': (0, 5, 7), 'sus': (0, 5, 7),
+    '5': (0, 7),
+    '6': (0, 4, 7, 9), 'm6': (0, 3, 7, 9),
+    '7': (0, 4, 7, 10), '7sus4': (0, 5, 7, 10), '7sus': (0, 5, 7, 10),
+    'maj7': (0, 4, 7, 11), 'M7': (0, 4, 7, 11),
+    'm7': (0, 3, 7, 10), 'min7': (0, 3, 7, 10),
+    'mM7': (0, 3, 7, 11), 'mmaj7': (0, 3, 7, 11),
+    'dim7': (0, 3, 6, 9), 'o7': (0, 3, 6, 9),
+    'm7b5': (0, 3, 6, 10), 'ø': (0, 3, 6, 10), 'ø7': (0, 3, 6, 10),
+    'aug7': (0, 4, 8, 10), '+7': (0, 4, 8, 10),
+    'add9': (0, 4, 7, 14), 'madd9': (0, 3, 7, 14), '6/9': (0, 4, 7, 9, 14), 'm6/9': (0, 3, 7, 9, 14),
+    '9': (0, 4, 7, 10, 14), 'maj9': (0, 4, 7, 11, 14), 'm9': (0, 3, 7, 10, 14),
+    '7b9': (0, 4, 7, 10, 13), '7#9': (0, 4, 7, 10, 15),
+    '11': (0, 4, 7, 10, 14, 17), 'm11': (0, 3, 7, 10, 14, 17),
+    '13': (0, 4, 7, 10, 14, 21), 'maj13': (0, 4, 7, 11, 14, 21), 'm13': (0, 3, 7, 10, 14, 21),
+}
+
+# Note name: letter plus sharps, or flats written as 'b' (lead sheet) or '-' (music21)
+_NOTE = r'([A-G])(#{1,2}|b{1,2}|-{1,2})?'
+_SYMBOL_RE = re.compile(rf'^{_NOTE}(.*?)(?:/{_NOTE})?$')
+
+def pitch_class(letter, accidental):
+    pc = PITCH_CLASSES[letter]
+    if accidental:
+        pc += len(accidental) if accidental[0] == '#' else -len(accidental)
+    return pc % 12
+
+def resolve(symbol):
+    """MIDI pitches for a chord symbol like 'Bbmaj7' or 'D/F#', or None if unknown
+
+    The root sits in octave 3 with the chord tones stacked above it; a slash
+    bass is placed below the root.
+    """
+    match = _SYMBOL_RE.match(symbol.strip())
+    if not match:
+        return None
+    root_letter, root_acc, kind, bass_letter, bass_acc = match.groups()
+    intervals = CHORD_INTERVALS.get(kind)
+    if intervals is None:
+        return None
+
+    root = ROOT_OCTAVE_BASE + pitch_class(root_letter, root_acc)
+    pitches = [root + i for i in intervals]
+    if bass_letter:
+        bass = root - (root - pitch_class(bass_letter, bass_acc)) % 12
+        if bass == root:
+            bass -= 12
+        pitches.insert(0, bass)
+    return pitches
+
+def to_music21_figure(symbol):
+    """Rewrite lead-sheet flats ('Bbmaj7', 'D/Ab') the way music21 expects them ('B-maj7', 'D/A-')"""
+    match = _SYMBOL_RE.match(symbol.strip())
+    if not match:
+        return symbol
+    root_letter, root_acc, kind, bass_letter, bass_acc = match.groups()
+    figure = root_letter + (root_acc or '').replace('b', '-') + kind
+    if bass_letter:
+        figure += '/' + bass_letter + (bass_acc or '').replace('b', '-')
+    return figure
+
+def build_table(symbols):
+    """Resolve symbols once, returning (voicings, errors)
+
+    music21 is used where it can parse the symbol so the table keeps the
+    voicings it produced; the built-in resolver covers the rest.
+    """
+    from music21 import harmony
+
+    voicings = {}
+    errors = {}
+    for symbol in sorted(set(symbols)):
+        try:
+            voicings[symbol] = [p.midi for p in harmony.ChordSymbol(to_music21_figure(symbol)).pitches]
+            continue
+        except Exception as e:
+            error = e
+        pitches = resolve(symbol)
+        if pitches is None:
+            errors[symbol] = str(error)
+        else:
+            voicings[symbol] = pitches
+    return voicings, errors
+
+_table = None
+_table_lock = threading.Lock()
+
+def load_table(path=VOICINGS_JSON):
+    """Precompiled {symbol: [midi, ...]} table, loaded once (no music21 import)"""
+    global _table
+    with _table_lock:
+        if _table is None:
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                _table = data['voicings'] if data.get('version') == TABLE_VERSION else {}
+            except (OSError, ValueError, KeyError):
+                _table = {}
+    return _table
+
+def voicing(symbol):
+    """MIDI pitches for symbol from the precompiled table or the built-in resolver, or None"""
+    pitches = load_table().get(symbol)
+    if pitches is None:
+        pitches = resolve(symbol)
+    return pitches
+
+def main():
+    with open(CHORDS_JSON, 'r') as f:
+        progressions = json.load(f)
+    symbols = [symbol for moods in progressions.values() for items in moods.values()
+               for progression in items for symbol in progression]
+
+    voicings, errors = build_table(symbols)
+    with open(VOICINGS_JSON, 'w') as f:
+        json.dump({'version': TABLE_VERSION, 'voicings': voicings}, f, separators=(',', ':'))
+    print(f"Resolved {len(voicings)} chord symbols -> {VOICINGS_JSON}")
+
+    if errors:
+        for symbol, error in errors.items():
+            print(f"Could not resolve chord '{symbol}': {error}")
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
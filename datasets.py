@@ -0,0 +1,124 @@
+# datasets.py
+import functools
+import json
+import os
+import re
+import threading
+import pattern_store
+
+CHORDS_JSON = os.path.join(os.path.dirname(__file__), 'json-data', 'popular_chords.json')
+
+_TOKEN_RE = re.compile(r'[0-9a-z]+')
+# Query fragments remembered per style; the GUI looks one up on every keystroke
+FRAGMENT_CACHE_SIZE = 256
+
+class InspiredByIndex:
+    """Token inverted index over the inspired_by field of one style's patterns"""
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+        self.names = [p.get('inspired_by', '').casefold() for p in patterns]
+        self.tokens = {}  # token -> set of pattern positions
+        for i, name in enumerate(self.names):
+            for token in _TOKEN_RE.findall(name):
+                self.tokens.setdefault(token, set()).add(i)
+        # query token -> positions whose tokens contain it, for the most recent fragments
+        self._containing = functools.lru_cache(maxsize=FRAGMENT_CACHE_SIZE)(self._positions_containing)
+
+    def _positions_containing(self, fragment):
+        positions = set()
+        for token, ids in self.tokens.items():
+            if fragment in token:
+                positions |= ids
+        return frozenset(positions)
+
+    def find(self, query):
+        """Patterns whose inspired_by contains query (case-insensitive), in corpus order"""
+        query = query.casefold()
+        fragments = _TOKEN_RE.findall(query)
+        if fragments:
+            # Every token of a matching query is part of some token of the name, so
+            # intersecting those sets gives the candidates; the substring check confirms
+            candidates = None
+            for fragment in sorted(fragments, key=len, reverse=True):
+                found = self._containing(fragment)
+                candidates = found if candidates is None else candidates & found
+                if not candidates:
+                    return []
+            positions = sorted(candidates)
+        else:
+            positions = range(len(self.names))
+        return [self.patterns[i] for i in positions if query in self.names[i]]
+
+class DatasetRegistry:
+    """Loads the drum pattern and chord corpora once and indexes them
+
+    Genre, style and mood names are looked up case-insensitively through
+    casefolded dictionaries instead of scanning the keys.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._drum_patterns = None
+        self._drum_keys = None    # genre.casefold() -> (genre, {style.casefold(): style})
+        self._chords = None
+        self._chord_keys = None   # genre.casefold() -> (genre, {mood.casefold(): mood})
+        self._inspired = {}       # (genre, style) -> InspiredByIndex
+
+    @staticmethod
+    def _fold_keys(data):
+        return {
+            genre.casefold(): (genre, {sub.casefold(): sub for sub in data[genre]})
+            for genre in data
+        }
+
+    def drum_patterns(self):
+        """Compiled drum patterns, {genre: {style: [pattern, ...]}}"""
+        with self._lock:
+            if self._drum_patterns is None:
+                self._drum_patterns = pattern_store.get_patterns()
+                self._drum_keys = self._fold_keys(self._drum_patterns)
+            return self._drum_patterns
+
+    def chord_progressions(self):
+        """Chord progressions, {genre: {mood: [[symbol, ...], ...]}}"""
+        with self._lock:
+            if self._chords is None:
+                with open(CHORDS_JSON, 'r') as f:
+                    self._chords = json.load(f)
+                self._chord_keys = self._fold_keys(self._chords)
+            return self._chords
+
+    def resolve_drum_genre(self, genre):
+        self.drum_patterns()
+        entry = self._drum_keys.get(genre.casefold())
+        return entry[0] if entry else None
+
+    def resolve_drum_style(self, genre, style):
+        """(genre_key, style_key) as spelled in the corpus; either is None if unknown"""
+        self.drum_patterns()
+        entry = self._drum_keys.get(genre.casefold())
+        if not entry:
+            return None, None
+        return entry[0], entry[1].get(style.casefold())
+
+    def resolve_mood(self, genre, mood):
+        """(genre_key, mood_key) as spelled in the corpus; either is None if unknown"""
+        self.chord_progressions()
+        entry = self._chord_keys.get(genre.casefold())
+        if not entry:
+            return None, None
+        return entry[0], entry[1].get(mood.casefold())
+
+    def find_patterns(self, genre_key, style_key, inspired_by=None):
+        """Patterns of a style matching inspired_by, falling back to the whole style"""
+        patterns = self.drum_patterns()[genre_key][style_key]
+        if not inspired_by:
+            return patterns
+        with self._lock:
+            index = self._inspired.get((genre_key, style_key))
+            if index is None:
+                index = self._inspired[(genre_key, style_key)] = InspiredByIndex(patterns)
+        return index.find(inspired_by) or patterns
+
+registry = DatasetRegistry()
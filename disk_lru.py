@@ -0,0 +1,79 @@
+# disk_lru.py
+import os
+import shutil
+import threading
+
+# A trim goes down to this share of the budget, so a full cache isn't rescanned on every write
+LOW_WATER = 0.9
+
+def scan_files(directory, suffix):
+    """(mtime_ns, size, path) of every file in directory ending in suffix"""
+    entries = []
+    with os.scandir(directory) as it:
+        for item in it:
+            if item.name.endswith(suffix) and item.is_file():
+                st = item.stat()
+                entries.append((st.st_mtime_ns, st.st_size, item.path))
+    return entries
+
+def scan_dirs(directory):
+    """(mtime_ns, size of its files, path) of every finished entry folder in directory"""
+    entries = []
+    with os.scandir(directory) as it:
+        for item in it:
+            if item.name.endswith('.tmp') or not item.is_dir():
+                continue
+            with os.scandir(item.path) as files:
+                size = sum(f.stat().st_size for f in files if f.is_file())
+            entries.append((item.stat().st_mtime_ns, size, item.path))
+    return entries
+
+def remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        os.remove(path)
+
+class DiskBudget:
+    """Running size of a cache folder, trimmed least recently used (oldest mtime) first
+
+    scan(directory) lists the entries as (mtime_ns, size, path). The folder
+    is only scanned on first use and when the tracked total goes over
+    max_bytes (and then trimmed to LOW_WATER of it); in between, add() just
+    counts what this process wrote.
+    Entries written by other processes are picked up by the next scan.
+    """
+
+    def __init__(self, directory, max_bytes, scan, remove=remove_path):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._scan = scan
+        self._remove = remove
+        self._lock = threading.Lock()
+        self.total = None
+
+    def add(self, nbytes):
+        """Count nbytes just written and trim the folder if that puts it over budget"""
+        with self._lock:
+            if self.total is None:
+                self.total = sum(size for _, size, _ in self._scan(self.directory))
+            else:
+                self.total += nbytes
+            if self.total > self.max_bytes:
+                self._trim()
+
+    def _trim(self):
+        entries = sorted(self._scan(self.directory))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            self.total = total
+            return
+        for _, size, path in entries:
+            if total <= self.max_bytes * LOW_WATER:
+                break
+            try:
+                self._remove(path)
+                total -= size
+            except OSError:
+                pass
+        self.total = total
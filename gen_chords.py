@@ -1,37 +1,145 @@
 # gen_chords.py (refactored)
+import io
 import os
-from music21 import stream, harmony, midi
-from chord_templates import chord_progressions, get_random_progression
+import random
+import mido
+from chord_templates import get_random_progression
+from datasets import registry, CHORDS_JSON
+from output_cache import output_cache, output_key, new_seed, file_stamp
+import chord_voicings
+import stages
 
-def generate_chord_progression(genre, mood, output_path):
-    # Validate inputs
-    genre_key = next((g for g in chord_progressions.keys() if g.lower() == genre.lower()), None)
+# Same layout music21's streamToMidiFile produced: 10080 ticks per quarter,
+# a conductor track plus one note track, velocity 90, one chord per bar
+TICKS_PER_BEAT = 10080
+CHORD_BEATS = 4
+VELOCITY = 90
+TEMPO = 500000  # 120 BPM
+
+def music21_voicing(symbol):
+    """Resolve a chord symbol with music21 (slow, only for symbols the fast path doesn't know)"""
+    from music21 import harmony
+    try:
+        cs = harmony.ChordSymbol(symbol)
+    except Exception as e:
+        raise ValueError(f"Error parsing chord '{symbol}': {e}")
+    return [p.midi for p in cs.pitches]
+
+def voice_progression(progression):
+    """MIDI pitch lists for each chord symbol in the progression"""
+    voicings = []
+    for symbol in progression:
+        pitches = chord_voicings.voicing(symbol)
+        if pitches is None:
+            pitches = music21_voicing(symbol)
+        voicings.append(pitches)
+    return voicings
+
+def progression_to_midi(voicings):
+    """Build the progression MIDI file directly with mido and return its bytes"""
+    conductor = mido.MidiTrack([
+        mido.MetaMessage('set_tempo', tempo=TEMPO, time=0),
+        mido.MetaMessage('time_signature', numerator=4, denominator=4, time=0),
+        mido.MetaMessage('end_of_track', time=TICKS_PER_BEAT)
+    ])
+
+    notes = mido.MidiTrack([
+        mido.MetaMessage('track_name', name='', time=0),
+        mido.Message('pitchwheel', channel=0, pitch=0, time=0)
+    ])
+    chord_ticks = CHORD_BEATS * TICKS_PER_BEAT
+    for pitches in voicings:
+        for pitch in pitches:
+            notes.append(mido.Message('note_on', channel=0, note=pitch, velocity=VELOCITY, time=0))
+        for i, pitch in enumerate(pitches):
+            notes.append(mido.Message('note_off', channel=0, note=pitch, velocity=0,
+                                      time=chord_ticks if i == 0 else 0))
+    notes.append(mido.MetaMessage('end_of_track', time=TICKS_PER_BEAT))
+
+    buffer = io.BytesIO()
+    mido.MidiFile(type=1, ticks_per_beat=TICKS_PER_BEAT, tracks=[conductor, notes]).save(file=buffer)
+    return buffer.getvalue()
+
+def progression_seconds(voicings):
+    """How long the progression MIDI plays: one bar per chord plus the trailing beat"""
+    return (len(voicings) * CHORD_BEATS + 1) * TEMPO / 1000000
+
+def resolve_mood(genre, mood):
+    """(genre_key, mood_key) as spelled in the corpus; ValueError if either is unknown"""
+    genre_key, mood_key = registry.resolve_mood(genre, mood)
     if not genre_key:
         raise ValueError(f"Invalid genre: {genre}")
-    
-    moods = chord_progressions[genre_key].keys()
-    mood_key = next((m for m in moods if m.lower() == mood.lower()), None)
     if not mood_key:
         raise ValueError(f"Invalid mood '{mood}' for genre '{genre}'")
+    return genre_key, mood_key
+
+def render_chord_progression(genre, mood, progress=None, cancel=None, seed=None):
+    """Pick and voice a random progression in memory without writing anything
+
+    Returns a dict with 'genre', 'mood', 'seed', 'progression', 'data' (the
+    MIDI bytes) and 'duration' in seconds; save_midi() can write the data
+    later. The pick comes from a random.Random(seed) of its own (a fresh
+    seed when None), so a seed always gives the same progression.
+    """
+    stages.enter_stage(stages.SELECTING, progress, cancel)
+
+    # Validate inputs
+    genre_key, mood_key = resolve_mood(genre, mood)
+    if seed is None:
+        seed = new_seed()
 
     # Generate progression
-    progression = get_random_progression(genre=genre_key, mood=mood_key)
-    
-    # Create MIDI stream
-    s = stream.Stream()
-    for symbol in progression:
-        try:
-            cs = harmony.ChordSymbol(symbol)
-            cs.duration.quarterLength = 4
-            s.append(cs)
-        except Exception as e:
-            raise ValueError(f"Error parsing chord '{symbol}': {e}")
+    progression = get_random_progression(genre=genre_key, mood=mood_key, rng=random.Random(seed))
+
+    # Voice the chords from the precompiled table (music21 only for unknown symbols) and build the MIDI
+    voicings = voice_progression(progression)
+    return {
+        'genre': genre_key,
+        'mood': mood_key,
+        'seed': seed,
+        'progression': progression,
+        'data': progression_to_midi(voicings),
+        'duration': progression_seconds(voicings)
+    }
+
+def chord_progression_key(genre_key, mood_key, seed):
+    """Output cache key of a progression: the request, its seed and the progression corpus"""
+    return output_key('chords', genre=genre_key, mood=mood_key, seed=seed, chords=file_stamp(CHORDS_JSON))
 
+def generate_chord_progression(genre, mood, output_path=None, progress=None, cancel=None, on_stats=None,
+                               seed=None, cache=output_cache):
+    """Generate a random progression as MIDI and write it to output_path if given
+
+    progress/cancel/on_stats, seed and cache work as in gen_loop.generate_drum_loop.
+    Returns {'seed', 'cached', 'data'} where data is the MIDI bytes.
+    """
+    if seed is None:
+        seed = new_seed()
+    with stages.instrumented(progress, on_stats, kind='chords', genre=genre, mood=mood, seed=seed) as progress:
+        key = None
+        if cache.directory:
+            key = chord_progression_key(*resolve_mood(genre, mood), seed)
+            buffer = io.BytesIO()
+            if cache.fetch(key, {'progression.mid': buffer}):
+                data = buffer.getvalue()
+                if output_path:
+                    save_midi(data, output_path)
+                return {'seed': seed, 'cached': True, 'data': data}
+
+        data = render_chord_progression(genre, mood, progress, cancel, seed)['data']
+
+        stages.enter_stage(stages.EXPORTING, progress, cancel)
+        if output_path:
+            save_midi(data, output_path)
+            if key:
+                cache.store(key, {'progression.mid': output_path}, seed=seed)
+        return {'seed': seed, 'cached': False, 'data': data}
+
+def save_midi(data, output_path):
+    """Write MIDI bytes from render_chord_progression() to output_path"""
     # Create parent directory if needed
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
+
     # Export MIDI
-    mf = midi.translate.streamToMidiFile(s)
-    mf.open(output_path, 'wb')
-    mf.write()
-    mf.close()
\ No newline at end of file
+    with open(output_path, 'wb') as f:
+        f.write(data)
@@ -1,10 +1,20 @@
 # gen_loop.py (fixed version)
-import json
+import hashlib
+import io
+import math
 import os
 import random
 from pydub import AudioSegment
-import glob
 import zipfile
+import numpy as np
+import mixer
+from sample_cache import get_sample
+from sample_index import get_index
+from stem_cache import stem_cache, stem_key, sample_digest
+from output_cache import output_cache, output_key, new_seed, file_stamp
+import pattern_store
+from datasets import registry
+import stages
 
 # Configuration
 DRUM_SAMPLES_DIR = "drum_samples"
@@ -25,139 +35,517 @@ INSTRUMENT_FOLDERS = {
     'Percussion': 'percussions'
 }
 
-with open("json-data/drum_patterns.json", "r") as f:
-    drum_patterns = json.load(f)
+# A loop is one pass of the 64-step patterns (4 bars of 16th notes)
+STEPS_PER_BAR = 16
+LOOP_BARS = 4
+# Frames mixed at a time when streaming an arrangement
+BLOCK_FRAMES = 65536
+# Fixed entry timestamp so the same loop always gives the same stems ZIP bytes
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
 
-def get_random_sample(instrument, genre):
+def get_random_sample(instrument, genre, rng=random):
     folder = INSTRUMENT_FOLDERS.get(instrument)
     if not folder:
         return None
-    samples = glob.glob(os.path.join('assets', DRUM_SAMPLES_DIR, genre, folder, "*.wav"))
-    return random.choice(samples) if samples else None
+    # Picked from the persistent sample index instead of globbing the folder every call
+    return get_index().random_sample(genre, folder, rng)
 
 def process_pattern(pattern, required_length=64):
     """Expand pattern to required length safely"""
-    if not pattern or len(pattern) == 0:
-        return [0] * required_length
-    repeats = required_length // len(pattern)
-    remainder = required_length % len(pattern)
-    return (pattern * repeats + pattern[:remainder])[:required_length]
-
-def select_pattern_and_instruments(style_data, genre, inspired_by=None):
-    """Select patterns with validation"""
+    return pattern_store.expand_pattern(pattern, required_length)
+
+def lane_onsets(data):
+    """Active steps for an instrument entry, from its compiled lane or a plain 0/1 pattern list"""
+    if 'lane' in data:
+        return data['lane']['onsets']
+    pattern = data.get('pattern')
+    if not pattern:
+        return None
+    return [step for step, val in enumerate(pattern) if val]
+
+def lane_steps(data):
+    """Length of an instrument entry's lane in steps"""
+    if 'lane' in data:
+        return data['lane']['steps']
+    return len(data.get('pattern') or ())
+
+def lane_bits(data):
+    """Bitmask of an instrument entry's lane"""
+    if 'lane' in data:
+        return data['lane']['bits']
+    pattern = data.get('pattern') or []
+    return pattern_store.pattern_to_bits(pattern, len(pattern))
+
+def repeat_onsets(onsets, steps, total_steps):
+    """Onsets of a steps-long lane looped over total_steps"""
+    if not steps:
+        return []
+    return [rep + step for rep in range(0, total_steps, steps) for step in onsets if rep + step < total_steps]
+
+def select_pattern_and_instruments(style_data, genre, inspired_by=None, rng=random):
+    """Select patterns with validation; every random pick comes from rng (a random.Random)"""
     if inspired_by:
         filtered = [p for p in style_data if inspired_by.lower() in p['inspired_by'].lower()]
-        selected_pattern = random.choice(filtered or style_data)
+        selected_pattern = rng.choice(filtered or style_data)
     else:
-        selected_pattern = random.choice(style_data)
+        selected_pattern = rng.choice(style_data)
+
+    # Raw JSON entries are compiled on the fly
+    if 'lanes' not in selected_pattern:
+        selected_pattern = pattern_store.compile_entry(selected_pattern)
 
     instruments = {}
     for instr in INSTRUMENT_FOLDERS.keys():
         json_key = JSON_INSTRUMENT_KEYS[instr]
-        pattern = selected_pattern.get(json_key, [])
+        lane = selected_pattern['lanes'].get(json_key)
         
         # Only add instrument if pattern is valid
-        if pattern and len(pattern) > 0:
-            sample = get_random_sample(instr, genre)
+        if lane:
+            sample = get_random_sample(instr, genre, rng)
             if sample:
                 instruments[instr] = {
-                    'pattern': process_pattern(pattern),
+                    'lane': lane,
                     'sample': sample
                 }
     return instruments
 
-def create_drum_loop(patterns, bpm=120):
-    """Create loop with pattern validation"""
-    beat_duration = 60 * 1000 / bpm
-    step_duration = beat_duration / 4
-    total_duration = 16 * 4 * step_duration  # 16 bars
-    loop = AudioSegment.silent(duration=total_duration)
-    
+def to_audio_segment(buffer, frame_rate):
+    """Wrap a float32 mix buffer in an AudioSegment for export"""
+    return AudioSegment(
+        data=mixer.to_int16(buffer).tobytes(),
+        sample_width=2,
+        frame_rate=frame_rate,
+        channels=buffer.shape[1]
+    )
+
+def render_stems(patterns, bpm=120, progress=None, cancel=None, bars=LOOP_BARS):
+    """Render every instrument into its own buffer and sum them into the master
+
+    Returns a dict with 'frame_rate', 'stems' (instrument -> float32 buffer),
+    'master' and 'duration' in seconds. The loop WAV and the stems all come
+    from these buffers.
+    Lanes are looped to fill bars. Stems come from the stem cache when the
+    same sample, lane, tempo, length and format were rendered before; stems
+    are read-only. progress/cancel work as in generate_drum_loop.
+    """
+    # Decoded samples come from the shared cache, then everything is mixed at the highest rate/channel count
+    stages.enter_stage(stages.DECODING, progress, cancel)
+    decoded = {instr: get_sample(data['sample']) for instr, data in patterns.items()}
+
+    stages.enter_stage(stages.MIXING, progress, cancel)
+    frame_rate, channels = mixer.mix_format(decoded.values())
+    total_frames = loop_frames(bpm, bars, frame_rate)
+    master = np.zeros((total_frames, channels), dtype=np.float32)
+    stems = {}
+
     for instr, data in patterns.items():
-        sample = AudioSegment.from_wav(data['sample'])
-        pattern = data['pattern']
-        
+        stages.check_cancel(cancel)
+        stem = render_stem(data, decoded[instr], bpm, bars, frame_rate, channels)
+
         # Final safety check
-        if len(pattern) == 0:
+        if stem is None:
             continue
-            
-        for step, val in enumerate(pattern):
-            if val:
-                position = step * step_duration
-                loop = loop.overlay(sample, position=position)
-    return loop
-
-def create_stems(patterns, output_dir):
-    """Create individual stem tracks"""
+
+        master += stem
+        stems[instr] = stem
+
+    return {'frame_rate': frame_rate, 'stems': stems, 'master': master, 'duration': total_frames / frame_rate}
+
+def loop_frames(bpm, bars, frame_rate):
+    """Length of a bars-long loop in frames"""
+    step_duration = 60 * 1000 / bpm / 4
+    return int(frame_rate * bars * STEPS_PER_BAR * step_duration / 1000.0)
+
+def render_stem(data, decoded, bpm, bars, frame_rate, channels):
+    """One instrument's stem at the mix format, or None without a lane
+
+    decoded is the (samples, frame_rate) of data['sample']. The stem comes
+    from the stem cache when possible and is read-only.
+    """
+    onsets = lane_onsets(data)
+    if onsets is None:
+        return None
+
+    key = stem_key(data['sample'], lane_bits(data), lane_steps(data), bpm, bars, frame_rate, channels)
+    stem = stem_cache.get(key)
+    if stem is None:
+        step_duration = 60 * 1000 / bpm / 4
+        onsets = repeat_onsets(onsets, lane_steps(data), bars * STEPS_PER_BAR)
+        sample = mixer.conform(*decoded, frame_rate, channels)
+        stem = np.zeros((loop_frames(bpm, bars, frame_rate), channels), dtype=np.float32)
+        mixer.mix_hits(stem, sample, mixer.onset_offsets(onsets, step_duration, frame_rate))
+        stem = stem_cache.put(key, stem)
+    return stem
+
+def create_drum_loop(patterns, bpm=120, bars=LOOP_BARS):
+    """Create loop with pattern validation"""
+    rendered = render_stems(patterns, bpm, bars=bars)
+    return to_audio_segment(rendered['master'], rendered['frame_rate'])
+
+def create_stems(patterns, output_dir, rendered=None):
+    """Create individual stem tracks
+
+    Pass the result of render_stems() as rendered to reuse its buffers
+    instead of rendering the patterns again.
+    """
     stems_dir = os.path.join(output_dir, 'stems')
     os.makedirs(stems_dir, exist_ok=True)
     stem_files = []
+
+    if rendered is None:
+        rendered = render_stems({
+            instr: data if 'lane' in data else {'pattern': process_pattern(data['pattern']), 'sample': data['sample']}
+            for instr, data in patterns.items()
+            if data['sample'] and os.path.exists(data['sample'])
+        })
     
-    for instr, data in patterns.items():
-        if not data['sample'] or not os.path.exists(data['sample']):
-            continue
-            
-        pattern = process_pattern(data['pattern'])
-        sample = AudioSegment.from_wav(data['sample'])
-        
-        # Create silent track for this stem
-        stem = AudioSegment.silent(duration=len(create_drum_loop({instr: data})))
-        
-        # Add hits
-        step_duration = len(stem) / len(pattern)
-        for step, val in enumerate(pattern):
-            if val:
-                position = step * step_duration
-                stem = stem.overlay(sample, position=position)
-        
+    for instr, stem in rendered['stems'].items():
         # Save stem
         stem_path = os.path.join(stems_dir, f"{instr}.wav")
-        stem.export(stem_path, format="wav")
+        to_audio_segment(stem, rendered['frame_rate']).export(stem_path, format="wav")
         stem_files.append(stem_path)
     
     return stem_files
 
-def generate_drum_loop(genre, style, inspired_by, output_path):
-    # Validate inputs
-    genre_key = next((g for g in drum_patterns.keys() if g.lower() == genre.lower()), None)
+def write_stems_zip(rendered, sink, compression=zipfile.ZIP_STORED, cancel=None):
+    """Encode every stem from memory straight into a ZIP archive
+
+    sink can be a path or any writable file-like object (it does not need to
+    be seekable), so a service can stream the archive to a client. Entries
+    are written one at a time; compression is zipfile.ZIP_STORED or
+    zipfile.ZIP_DEFLATED. Entries carry a fixed timestamp, so the archive
+    only depends on the stems.
+    """
+    with zipfile.ZipFile(sink, 'w', compression=compression) as zipf:
+        for instr, stem in rendered['stems'].items():
+            stages.check_cancel(cancel)
+            info = zipfile.ZipInfo(f"{instr}.wav", date_time=ZIP_DATE_TIME)
+            info.compress_type = compression
+            info.external_attr = 0o600 << 16
+            with zipf.open(info, 'w') as entry:
+                mixer.write_wav(entry, stem, rendered['frame_rate'])
+
+def resolve_drum_style(genre, style):
+    """(genre_key, style_key) as spelled in the corpus; ValueError if either is unknown"""
+    genre_key, style_key = registry.resolve_drum_style(genre, style)
     if not genre_key:
         raise ValueError(f"Invalid genre: {genre}")
-    
-    styles = drum_patterns[genre_key].keys()
-    style_key = next((s for s in styles if s.lower() == style.lower()), None)
     if not style_key:
         raise ValueError(f"Invalid style '{style}' for genre '{genre}'")
+    return genre_key, style_key
+
+def render_drum_loop(genre, style, inspired_by, bpm=120, progress=None, cancel=None, bars=LOOP_BARS, seed=None):
+    """Select patterns/samples and render the loop in memory without writing anything
+
+    Returns a dict with 'genre', 'style', 'inspired_by', 'bpm', 'bars',
+    'seed', 'patterns', 'rendered' (see render_stems) and 'duration' that
+    write_drum_loop() can save later. Every pick comes from a
+    random.Random(seed) of its own, so the same seed and library give the
+    same loop; without a seed a fresh one is drawn.
+    """
+    stages.enter_stage(stages.SELECTING, progress, cancel)
 
-    # Generate loop
+    # Validate inputs
+    genre_key, style_key = resolve_drum_style(genre, style)
+    if seed is None:
+        seed = new_seed()
+
+    # Generate loop (the registry's inspired_by index does the artist filtering)
     patterns = select_pattern_and_instruments(
-        drum_patterns[genre_key][style_key],
+        registry.find_patterns(genre_key, style_key, inspired_by),
         genre_key,
-        inspired_by
+        rng=random.Random(seed)
     )
     
     if not patterns:
         raise ValueError("No instruments could be selected for the loop")
 
+    # Render the stems and master in one pass
+    rendered = render_stems(patterns, bpm, progress, cancel, bars)
+    return {
+        'genre': genre_key,
+        'style': style_key,
+        'inspired_by': inspired_by,
+        'bpm': bpm,
+        'bars': bars,
+        'seed': seed,
+        'patterns': patterns,
+        'rendered': rendered,
+        'duration': rendered['duration']
+    }
+
+class LoopSession:
+    """A rendered drum loop that can be changed one instrument at a time
+
+    Wraps a render_drum_loop() result and keeps it up to date: reroll()
+    picks a new lane and/or sample for one instrument, renders only that
+    stem and swaps it into the master by subtracting the old stem and adding
+    the new one. Locked instruments are left alone by reroll_unlocked().
+    The loop stays usable with loop_wav_bytes() and write_drum_loop().
+    A re-roll never changes a loop dict in place: self.loop is replaced by
+    an updated copy, so a loop that is still being auditioned or saved stays
+    as it was. Re-rolls draw from their own generator derived from the loop's seed, so
+    the same seed and sequence of re-rolls give the same loop.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.locked = set()
+        self.rng = random.Random(f"{loop['seed']}:reroll" if loop.get('seed') is not None else None)
+
+    @classmethod
+    def create(cls, genre, style, inspired_by=None, bpm=120, bars=LOOP_BARS, progress=None, cancel=None, seed=None):
+        return cls(render_drum_loop(genre, style, inspired_by, bpm, progress, cancel, bars, seed))
+
+    def set_locked(self, instr, locked=True):
+        if locked:
+            self.locked.add(instr)
+        else:
+            self.locked.discard(instr)
+
+    def _pick_lane(self, instr):
+        json_key = JSON_INSTRUMENT_KEYS[instr]
+        loop = self.loop
+        candidates = registry.find_patterns(loop['genre'], loop['style'], loop['inspired_by'])
+        lanes = []
+        for pattern in candidates:
+            if 'lanes' not in pattern:
+                pattern = pattern_store.compile_entry(pattern)
+            lane = pattern['lanes'].get(json_key)
+            if lane:
+                lanes.append(lane)
+        return self.rng.choice(lanes) if lanes else None
+
+    def reroll(self, instr, pattern=True, sample=True, cancel=None):
+        """Give instr a new lane and/or sample and re-mix only its stem; returns False if nothing changed"""
+        stages.check_cancel(cancel)
+        loop = self.loop
+        old = loop['patterns'].get(instr)
+        lane = self._pick_lane(instr) if pattern or old is None else old['lane']
+        path = get_random_sample(instr, loop['genre'], self.rng) if sample or old is None else old['sample']
+        if not lane or not path:
+            return False
+        data = {'lane': lane, 'sample': path}
+
+        rendered = loop['rendered']
+        patterns = {**loop['patterns'], instr: data}
+        decoded = get_sample(path)
+        frame_rate, channels = mixer.mix_format([decoded, (rendered['master'][:0], rendered['frame_rate'])])
+        if (frame_rate, channels) != (rendered['frame_rate'], rendered['master'].shape[1]):
+            # The new sample needs a wider mix format: render again (the other stems come from the cache)
+            rendered = render_stems(patterns, loop['bpm'], cancel=cancel, bars=loop['bars'])
+        else:
+            stem = render_stem(data, decoded, loop['bpm'], loop['bars'], frame_rate, channels)
+            stages.check_cancel(cancel)
+            # A new master: the old one may still be in use by an audition or a save
+            old_stem = rendered['stems'].get(instr)
+            master = rendered['master'] - old_stem if old_stem is not None else rendered['master'].copy()
+            master += stem
+            rendered = {**rendered, 'master': master, 'stems': {**rendered['stems'], instr: stem}}
+        # The encoded WAV of the old loop doesn't carry over
+        self.loop = {key: value for key, value in loop.items() if key != 'wav'}
+        self.loop.update(patterns=patterns, rendered=rendered)
+        return True
+
+    def reroll_unlocked(self, pattern=True, sample=True, cancel=None):
+        """Re-roll every instrument of the loop that is not locked; returns the ones that changed
+
+        Instruments the loop doesn't have are left out, so its instrumentation stays the same.
+        """
+        return [instr for instr in list(self.loop['patterns'])
+                if instr not in self.locked and self.reroll(instr, pattern, sample, cancel)]
+
+def loop_wav_bytes(loop):
+    """The loop's master as WAV file bytes, encoded once and kept in the loop dict
+
+    The GUI auditions these straight from memory; write_drum_loop() saves the same bytes.
+    """
+    if 'wav' not in loop:
+        buffer = io.BytesIO()
+        mixer.write_wav(buffer, loop['rendered']['master'], loop['rendered']['frame_rate'])
+        loop['wav'] = buffer.getvalue()
+    return loop['wav']
+
+def write_drum_loop(loop, output_path, stems_sink=None, stems_compression=zipfile.ZIP_STORED,
+                    progress=None, cancel=None):
+    """Export a render_drum_loop() result to output_path plus its stems ZIP"""
+    rendered = loop['rendered']
+
+    stages.enter_stage(stages.EXPORTING, progress, cancel)
     # Create parent directory if needed
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    # Export WAV
-    loop = create_drum_loop(patterns)
-    loop.export(output_path, format="wav")
+    with open(output_path, 'wb') as f:
+        f.write(loop_wav_bytes(loop))
 
-    folder_path = os.path.dirname(output_path)
-    filename = os.path.basename(output_path)
+    # Zip the stems straight from memory, next to the loop unless a sink is given
+    if rendered['stems']:
+        stages.enter_stage(stages.ZIPPING, progress, cancel)
+        if stems_sink is None:
+            stems_sink = f"{os.path.splitext(output_path)[0]}.zip"
+        write_stems_zip(rendered, stems_sink, stems_compression, cancel)
 
-    # Create and zip stems
-    stems = create_stems(patterns, folder_path)
+def library_digest(genre):
+    """Hash of the names and contents of every sample a loop in genre can pick
 
-    if stems:
-        zip_path = os.path.join(folder_path, f"{os.path.splitext(filename)[0]}.zip")
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for stem in stems:
-                zipf.write(stem, os.path.basename(stem))
-        
-        # Cleanup stem files
-        for stem in stems:
-            os.remove(stem)
-        os.rmdir(os.path.join(folder_path, 'stems'))
\ No newline at end of file
+    Content hashes come from stem_cache.sample_digest (hashed again only when
+    a file's size/mtime change), so a sample overwritten in place changes it.
+    """
+    digest = hashlib.sha1()
+    index = get_index()
+    for folder in INSTRUMENT_FOLDERS.values():
+        for path in index.samples(genre, folder):
+            digest.update(f"{folder}/{os.path.basename(path)}:{sample_digest(path)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def drum_loop_key(genre_key, style_key, inspired_by, seed, bpm, bars, stems_compression=zipfile.ZIP_STORED):
+    """Output cache key of a loop: the request, its seed and the pattern corpus/sample library it picks from"""
+    return output_key(
+        'drums', genre=genre_key, style=style_key, inspired_by=inspired_by or None, seed=seed, bpm=bpm,
+        bars=bars, stems_compression=stems_compression,
+        patterns=file_stamp(pattern_store.PATTERNS_JSON),
+        samples=library_digest(genre_key)
+    )
+
+def generate_drum_loop(genre, style, inspired_by, output_path, bpm=120, stems_sink=None,
+                       stems_compression=zipfile.ZIP_STORED, progress=None, cancel=None, on_stats=None,
+                       bars=LOOP_BARS, seed=None, cache=output_cache):
+    """Render a loop to output_path and its stems ZIP
+
+    progress(stage) is called as each stage (see stages.py) starts. Setting
+    cancel (a threading.Event) stops the render with stages.GenerationCancelled.
+    on_stats(stages) receives the duration and peak memory of every stage
+    (see stages.instrumented).
+    The loop is made from seed (a fresh one when None). With the output
+    cache enabled (see output_cache.py) a loop that was made before is copied
+    from there instead of rendered. Returns {'seed', 'cached'}.
+    """
+    if seed is None:
+        seed = new_seed()
+    with stages.instrumented(progress, on_stats, kind='drums', genre=genre, style=style, bpm=bpm, seed=seed) as progress:
+        key = None
+        if cache.directory:
+            key = drum_loop_key(*resolve_drum_style(genre, style), inspired_by, seed, bpm, bars, stems_compression)
+            stems_target = f"{os.path.splitext(output_path)[0]}.zip" if stems_sink is None else stems_sink
+            stages.check_cancel(cancel)
+            if cache.fetch(key, {'loop.wav': output_path, 'stems.zip': stems_target}):
+                return {'seed': seed, 'cached': True}
+
+        loop = render_drum_loop(genre, style, inspired_by, bpm, progress, cancel, bars, seed)
+        write_drum_loop(loop, output_path, stems_sink, stems_compression, progress, cancel)
+        # Only files on disk can be copied into the cache
+        if key and (stems_sink is None or isinstance(stems_sink, (str, os.PathLike))):
+            cache.store(key, {'loop.wav': output_path, 'stems.zip': stems_target},
+                        seed=seed, duration=loop['duration'])
+        return {'seed': seed, 'cached': False}
+
+def sections_for_duration(seconds, bpm=120, section_bars=16):
+    """Section lengths in bars that cover at least seconds at bpm"""
+    total_bars = max(1, math.ceil(seconds * bpm / (60 * 4)))
+    sections = [section_bars] * (total_bars // section_bars)
+    if total_bars % section_bars:
+        sections.append(total_bars % section_bars)
+    return sections
+
+def plan_arrangement(genre, style, inspired_by=None, sections=(16,), progress=None, cancel=None, rng=random):
+    """Pick a pattern and samples for every section of an arrangement
+
+    sections is a list of bar counts. Returns [{'bars', 'patterns'}, ...]
+    where patterns is what select_pattern_and_instruments() returns; the
+    picks come from rng (a random.Random).
+    """
+    stages.enter_stage(stages.SELECTING, progress, cancel)
+    genre_key, style_key = resolve_drum_style(genre, style)
+
+    candidates = registry.find_patterns(genre_key, style_key, inspired_by)
+    arrangement = []
+    for bars in sections:
+        patterns = select_pattern_and_instruments(candidates, genre_key, rng=rng)
+        if not patterns:
+            raise ValueError("No instruments could be selected for the arrangement")
+        arrangement.append({'bars': bars, 'patterns': patterns})
+    return arrangement
+
+def arrangement_hits(arrangement, samples, step_duration, frame_rate):
+    """(frame, sample) for every hit of the arrangement in frame order, one section at a time"""
+    start_step = 0
+    for section in arrangement:
+        section_steps = section['bars'] * STEPS_PER_BAR
+        hits = []
+        for data in section['patterns'].values():
+            onsets = lane_onsets(data)
+            if onsets is None:
+                continue
+            steps = [start_step + step for step in repeat_onsets(onsets, lane_steps(data), section_steps)]
+            sample = samples[data['sample']]
+            hits.extend((offset, sample) for offset in mixer.onset_offsets(steps, step_duration, frame_rate))
+        hits.sort(key=lambda hit: hit[0])
+        yield from hits
+        start_step += section_steps
+
+def render_arrangement(arrangement, sink, bpm=120, block_frames=BLOCK_FRAMES, progress=None, cancel=None):
+    """Stream an arrangement from plan_arrangement() to sink as a 16-bit WAV
+
+    The mix is rendered block_frames at a time straight into the writer, so
+    memory use stays the same however long the arrangement is; samples that
+    ring past a block boundary carry over into the next block. sink is a path
+    or a writable file-like object (it does not need to be seekable).
+    Returns 'frame_rate', 'channels', 'frames', 'bars' and 'duration'.
+    """
+    beat_duration = 60 * 1000 / bpm
+    step_duration = beat_duration / 4
+    total_steps = sum(section['bars'] for section in arrangement) * STEPS_PER_BAR
+
+    stages.enter_stage(stages.DECODING, progress, cancel)
+    paths = {data['sample'] for section in arrangement for data in section['patterns'].values()}
+    decoded = {path: get_sample(path) for path in paths}
+
+    stages.enter_stage(stages.MIXING, progress, cancel)
+    frame_rate, channels = mixer.mix_format(decoded.values())
+    samples = {path: mixer.conform(*decoded[path], frame_rate, channels) for path in paths}
+    total_frames = int(frame_rate * total_steps * step_duration / 1000.0)
+    tail_frames = max((len(sample) for sample in samples.values()), default=0)
+
+    def blocks():
+        hits = arrangement_hits(arrangement, samples, step_duration, frame_rate)
+        for block in mixer.mix_blocks(hits, total_frames, channels, block_frames, tail_frames):
+            stages.check_cancel(cancel)
+            yield block
+
+    if isinstance(sink, (str, os.PathLike)):
+        os.makedirs(os.path.dirname(os.path.abspath(sink)), exist_ok=True)
+        try:
+            with open(sink, 'wb') as f:
+                mixer.write_wav_stream(f, blocks(), total_frames, frame_rate, channels)
+        except BaseException:
+            # Don't leave a truncated WAV behind
+            try:
+                os.remove(sink)
+            except OSError:
+                pass
+            raise
+    else:
+        mixer.write_wav_stream(sink, blocks(), total_frames, frame_rate, channels)
+
+    return {
+        'frame_rate': frame_rate,
+        'channels': channels,
+        'frames': total_frames,
+        'bars': total_steps // STEPS_PER_BAR,
+        'duration': total_frames / frame_rate
+    }
+
+def generate_arrangement(genre, style, inspired_by, output_path, sections=(16,), bpm=120,
+                         block_frames=BLOCK_FRAMES, progress=None, cancel=None, on_stats=None, seed=None):
+    """Render a multi-section drum arrangement of any length to output_path
+
+    sections is a list of bar counts, each getting its own pattern and samples
+    (see sections_for_duration() to cover a length in seconds). Returns the
+    seed, the plan and the render_arrangement() metadata. seed and
+    progress/cancel/on_stats work as in generate_drum_loop.
+    """
+    if seed is None:
+        seed = new_seed()
+    with stages.instrumented(progress, on_stats, kind='arrangement', genre=genre, style=style, bpm=bpm, seed=seed) as progress:
+        arrangement = plan_arrangement(genre, style, inspired_by, sections, progress, cancel, random.Random(seed))
+        info = render_arrangement(arrangement, output_path, bpm, block_frames, progress, cancel)
+    return {'seed': seed, 'sections': arrangement, **info}
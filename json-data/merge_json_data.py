@@ -1,77 +1,199 @@
 import os
 import json
+import hashlib
 from pathlib import Path
 
-def merge_drum_patterns(input_dir: Path, output_file: Path) -> None:
+STATE_VERSION = 1
+
+def shard_fingerprint(file: Path, previous: dict = None) -> dict:
+    """Size, mtime and SHA-1 of a shard; the hash is reused while size/mtime are unchanged"""
+    st = file.stat()
+    if previous and previous.get('size') == st.st_size and previous.get('mtime_ns') == st.st_mtime_ns:
+        return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': previous['sha1']}
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': hashlib.sha1(file.read_bytes()).hexdigest()}
+
+def load_state(state_file: Path) -> dict:
+    try:
+        with state_file.open("r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get('version') == STATE_VERSION:
+            return state
+    except (OSError, ValueError):
+        pass
+    return {'version': STATE_VERSION, 'output_sha1': None, 'shards': {}}
+
+def previous_patterns(state: dict, output_file: Path, output_sha1: str) -> dict:
+    """Compact pattern lines of the previous merged output, {(genre, style): set of lines}"""
+    previous: dict = {}
+    if output_sha1 is not None and output_sha1 == state.get('output_sha1'):
+        # The state holds exactly what was written last time
+        for name, shard in state['shards'].items():
+            genre, style = Path(name).stem.split("-", 1)
+            previous.setdefault((genre, style), set()).update(shard['patterns'])
+    elif output_sha1 is not None:
+        try:
+            with output_file.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return previous
+        for genre, styles in data.items():
+            for style, patterns in styles.items():
+                previous[(genre, style)] = {
+                    json.dumps(patt, ensure_ascii=False, separators=(",", ":")) for patt in patterns
+                }
+    return previous
+
+def merge_drum_patterns(input_dir: Path, output_file: Path, state_file: Path = None) -> dict:
     """
     Merge all JSON drum pattern files in input_dir into a single JSON file at output_file.
 
     Each file in input_dir should be named <genre>-<style>.json and contain a JSON structure
     with a single top-level genre key mapping to styles and patterns.
     The merged output will organize patterns under their respective genres and styles.
-    """
-    merged: dict = {}
 
+    Each shard's fingerprint and accepted patterns are kept in state_file, so
+    unchanged shards are not parsed again and nothing is written when no shard
+    changed. The output is written in one streaming pass, one pattern per line.
+    Returns a report with the added, duplicate and skipped patterns; a
+    pattern only counts as added if its ID or content was not in the
+    previous output.
+    """
     # Ensure input directory exists
     if not input_dir.is_dir():
         raise NotADirectoryError(f"Input directory '{input_dir}' does not exist or is not a directory.")
 
-    # Iterate over all JSON files in the input directory
-    for file in input_dir.glob("*.json"):
-        # Expect filename like "genre-style.json"
+    if state_file is None:
+        state_file = output_file.with_name(output_file.stem + ".merge-state.json")
+    state = load_state(state_file)
+    old_shards = state['shards']
+
+    report = {'added': [], 'duplicates': [], 'skipped': [], 'unchanged': [], 'written': False}
+
+    # Group shards by (genre, style); expect filename like "genre-style.json"
+    groups: dict = {}
+    fingerprints: dict = {}
+    for file in sorted(input_dir.glob("*.json")):
         name_parts = file.stem.split("-", 1)
         if len(name_parts) != 2:
             print(f"Skipping file with unexpected name format: {file.name}")
+            report['skipped'].append({'file': file.name, 'reason': 'unexpected name format'})
             continue
-        genre, style = name_parts
+        groups.setdefault(tuple(name_parts), []).append(file)
+        fingerprints[file.name] = shard_fingerprint(file, old_shards.get(file.name))
 
-        # Load JSON content
-        try:
-            with file.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON in file {file.name}: {e}")
-            continue
+    output_sha1 = None
+    if output_file.exists():
+        output_sha1 = shard_fingerprint(output_file, state.get('output'))['sha1']
 
-        # Ensure structure matches expectation
-        if genre not in data or style not in data[genre]:
-            # if file data nested differently, try to adapt
-            # e.g., data: { genre: { style: [...] } }
-            print(f"Unexpected data structure in {file.name}, expected key '{genre}' with subkey '{style}'. Skipping.")
-            continue
+    nothing_changed = (
+        output_sha1 is not None and output_sha1 == state.get('output_sha1')
+        and set(fingerprints) == set(old_shards)
+        and all(old_shards[name]['sha1'] == fp['sha1'] for name, fp in fingerprints.items())
+    )
+    if nothing_changed:
+        report['unchanged'] = sorted(fingerprints)
+        print(f"Drum patterns unchanged, {output_file} not rewritten")
+        return report
+
+    previous = previous_patterns(state, output_file, output_sha1)
+    new_shards: dict = {}
+    # genre -> style -> [compact pattern JSON, ...] in merge order
+    merged: dict = {}
+
+    for (genre, style), files in sorted(groups.items()):
+        # A group is reused as-is only if every shard in it is unchanged
+        reuse = all(
+            f.name in old_shards and old_shards[f.name]['sha1'] == fingerprints[f.name]['sha1']
+            for f in files
+        )
+        lines = merged.setdefault(genre, {}).setdefault(style, [])
+        existing_ids: set = set()
+        previous_lines = previous.get((genre, style), set())
 
-        patterns = data[genre][style]
+        for file in files:
+            if reuse:
+                shard = old_shards[file.name]
+                lines.extend(shard['patterns'])
+                new_shards[file.name] = {**fingerprints[file.name], 'patterns': shard['patterns']}
+                report['unchanged'].append(file.name)
+                continue
 
-        # Initialize genre and style in merged dict
-        if genre not in merged:
-            merged[genre] = {}
-        if style not in merged[genre]:
-            merged[genre][style] = []
+            # Load JSON content
+            try:
+                with file.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except json.JSONDecodeError as e:
+                print(f"Error decoding JSON in file {file.name}: {e}")
+                report['skipped'].append({'file': file.name, 'reason': f'invalid JSON: {e}'})
+                continue
 
-        # Append patterns, avoiding duplicate pattern_ids
-        existing_ids = {p.get("pattern_id") for p in merged[genre][style]}
-        for patt in patterns:
-            pid = patt.get("pattern_id")
-            if pid in existing_ids:
-                print(f"Duplicate pattern_id '{pid}' in {file.name}, skipping.")
-            else:
-                merged[genre][style].append(patt)
+            # Ensure structure matches expectation
+            if genre not in data or style not in data[genre]:
+                print(f"Unexpected data structure in {file.name}, expected key '{genre}' with subkey '{style}'. Skipping.")
+                report['skipped'].append({'file': file.name, 'reason': 'unexpected data structure'})
+                continue
 
-    # Write merged output
+            # Append patterns, avoiding duplicate pattern_ids (running set per genre/style)
+            shard_lines = []
+            for patt in data[genre][style]:
+                pid = patt.get("pattern_id")
+                if pid in existing_ids:
+                    print(f"Duplicate pattern_id '{pid}' in {file.name}, skipping.")
+                    report['duplicates'].append({'file': file.name, 'pattern_id': pid})
+                    continue
+                existing_ids.add(pid)
+                line = json.dumps(patt, ensure_ascii=False, separators=(",", ":"))
+                shard_lines.append(line)
+                if line not in previous_lines:
+                    report['added'].append({'file': file.name, 'pattern_id': pid})
+            lines.extend(shard_lines)
+            new_shards[file.name] = {**fingerprints[file.name], 'patterns': shard_lines}
+
+    # Write merged output in one pass: compact, one pattern per line
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    with output_file.open("w", encoding="utf-8") as f:
-        json.dump(merged, f, ensure_ascii=False, indent=2)
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    with tmp_file.open("w", encoding="utf-8") as f:
+        f.write("{")
+        for gi, (genre, styles) in enumerate(merged.items()):
+            f.write(("," if gi else "") + "\n" + json.dumps(genre, ensure_ascii=False) + ":{")
+            for si, (style, lines) in enumerate(styles.items()):
+                f.write(("," if si else "") + "\n" + json.dumps(style, ensure_ascii=False) + ":[")
+                f.write(",".join("\n" + line for line in lines))
+                f.write("\n]")
+            f.write("\n}")
+        f.write("\n}\n")
+    os.replace(tmp_file, output_file)
+    report['written'] = True
+
+    output_fp = shard_fingerprint(output_file)
+    state = {'version': STATE_VERSION, 'output_sha1': output_fp['sha1'], 'output': output_fp, 'shards': new_shards}
+    with state_file.open("w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+
     print(f"Merged drum patterns written to {output_file}")
+    return report
+
+def print_report(report: dict) -> None:
+    print(f"Merge report: {len(report['added'])} added, {len(report['duplicates'])} duplicates, "
+          f"{len(report['skipped'])} skipped, {len(report['unchanged'])} unchanged shards")
+    for item in report['added']:
+        print(f"  added      {item['pattern_id']} ({item['file']})")
+    for item in report['duplicates']:
+        print(f"  duplicate  {item['pattern_id']} ({item['file']})")
+    for item in report['skipped']:
+        print(f"  skipped    {item['file']}: {item['reason']}")
 
 def main():
     print('Merging json files...')
-    
+
     # Define input and output paths relative to script location
     base_dir = Path(__file__).resolve().parent
     input_directory = base_dir / "drum_patterns"
     output_path = base_dir / "drum_patterns.json"
 
-    merge_drum_patterns(input_directory, output_path)
+    report = merge_drum_patterns(input_directory, output_path)
+    print_report(report)
+    return report
 
 
 if __name__ == "__main__":
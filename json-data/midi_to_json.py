@@ -1,9 +1,10 @@
 import os
 import json
-import mido
-import time
+import hashlib
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import merge_json_data
+from smf_scan import scan_note_ons, ticks_to_pattern
 
 # Mapping from folder names to JSON instrument keys
 INSTRUMENT_MAPPING = {
@@ -15,40 +16,106 @@ INSTRUMENT_MAPPING = {
     'percussions': 'Percussion'
 }
 
-def main():
-    genre = 'house'
-    style = 'makompo'
-
-    # Genre at index 0, style at index 1
-    genre_style_list = [
-        ['house', 'makompo'], 
-        ['hiphop', 'trap'],
-        ['hiphop', 'drill'],
-    ]
-
+MIDI_ROOT = os.path.join('assets', 'midi')
+SHARDS_DIR = os.path.join('json-data', 'drum_patterns')
+# Content-hash cache of already processed MIDI files
+CACHE_PATH = os.path.join('json-data', 'midi_cache.json')
+CACHE_VERSION = 2
+
+def discover_genre_styles(root=MIDI_ROOT):
+    """All [genre, style] pairs that have a folder under assets/midi/<genre>/<style>"""
+    pairs = []
+    for genre in sorted(os.listdir(root)):
+        genre_dir = os.path.join(root, genre)
+        if not os.path.isdir(genre_dir):
+            continue
+        for style in sorted(os.listdir(genre_dir)):
+            if os.path.isdir(os.path.join(genre_dir, style)):
+                pairs.append([genre, style])
+    return pairs
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path, 'r') as f:
+            cache = json.load(f)
+        if cache.get('version') == CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {'version': CACHE_VERSION, 'files': {}, 'patterns': {}}
+
+def save_cache(cache, path=CACHE_PATH):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def main(workers=None):
+    # Genre at index 0, style at index 1, discovered from the folders under assets/midi
+    genre_style_list = discover_genre_styles()
+
+    cache = load_cache()
+    cached_files = cache['files']
+    cached_patterns = cache['patterns']
+
+    # Find every MIDI file, hashing only the ones whose size/mtime changed
+    midi_files = []  # (genre, style, json_key, inspired_by, midi_path, digest)
+    seen = set()
     for genre, style in genre_style_list:
-        root_dir = f'assets/midi/{genre}/{style}'
-        patterns = defaultdict(dict)
+        root_dir = os.path.join(MIDI_ROOT, genre, style)
 
-        # Process all MIDI files in subdirectories
         for instrument_folder, json_key in INSTRUMENT_MAPPING.items():
             instrument_dir = os.path.join(root_dir, instrument_folder)
-            
+
             if not os.path.exists(instrument_dir):
                 print(f'instrument_dir "{instrument_dir}" does not exist')
                 continue
 
-            for filename in os.listdir(instrument_dir):
+            for filename in sorted(os.listdir(instrument_dir)):
                 if filename.endswith('.mid'):
                     midi_path = os.path.join(instrument_dir, filename)
                     inspired_by = os.path.splitext(filename)[0]
-                    # print('inspired_by:', inspired_by)
-                    
-                    # Process MIDI file to get pattern
-                    pattern = process_midi(midi_path)
-                    
-                    # Add to patterns dictionary
-                    patterns[inspired_by][json_key] = pattern
+                    st = os.stat(midi_path)
+                    entry = cached_files.get(midi_path)
+                    if not entry or entry['size'] != st.st_size or entry['mtime_ns'] != st.st_mtime_ns:
+                        entry = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': file_digest(midi_path)}
+                        cached_files[midi_path] = entry
+                    seen.add(midi_path)
+                    midi_files.append((genre, style, json_key, inspired_by, midi_path, entry['sha1']))
+
+    # Parse only new or changed content, in parallel
+    todo = {}
+    for *_, midi_path, digest in midi_files:
+        if digest not in cached_patterns:
+            todo.setdefault(digest, midi_path)
+    if todo:
+        print(f'Parsing {len(todo)} new or changed MIDI files...')
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for digest, pattern in zip(todo, pool.map(process_midi, todo.values())):
+                cached_patterns[digest] = pattern
+
+    # Forget files that were removed and patterns nothing refers to anymore
+    for midi_path in list(cached_files):
+        if midi_path not in seen:
+            del cached_files[midi_path]
+    used = {entry['sha1'] for entry in cached_files.values()}
+    for digest in list(cached_patterns):
+        if digest not in used:
+            del cached_patterns[digest]
+    save_cache(cache)
+
+    # Group patterns per genre/style shard
+    shards = defaultdict(lambda: defaultdict(dict))
+    for genre, style, json_key, inspired_by, midi_path, digest in midi_files:
+        shards[(genre, style)][inspired_by][json_key] = cached_patterns[digest]
+
+    changed = 0
+    for genre, style in genre_style_list:
+        patterns = shards.get((genre, style), {})
 
         # Create output JSON structure
         output = {
@@ -68,44 +135,35 @@ def main():
             output[f"{genre}"][f"{style}"].append(pattern_entry)
             pattern_number += 1
 
-        # Save to JSON file
-        with open(os.path.join('json-data', 'drum_patterns', f'{genre}-{style}.json'), 'w') as f:
-            json.dump(output, f, indent=2)
-    
-    print('Drum Pattern json files created...')
+        # Only rewrite shards whose content changed
+        shard_path = os.path.join(SHARDS_DIR, f'{genre}-{style}.json')
+        content = json.dumps(output, indent=2)
+        try:
+            with open(shard_path, 'r') as f:
+                if f.read() == content:
+                    continue
+        except OSError:
+            pass
+        with open(shard_path, 'w') as f:
+            f.write(content)
+        changed += 1
+        print(f'Updated {shard_path}')
+
+    print(f'Drum Pattern json files created... ({changed} of {len(genre_style_list)} changed)')
 
     # Merge the json files created
-    time.sleep(1)
-    merge_json_data.main()
+    if changed or not os.path.exists(os.path.join('json-data', 'drum_patterns.json')):
+        merge_json_data.main()
 
 def process_midi(midi_path):
     try:
-        mid = mido.MidiFile(midi_path)
-    except:
+        with open(midi_path, 'rb') as f:
+            ticks_per_beat, note_ticks, _ = scan_note_ons(f.read())
+    except (OSError, ValueError):
         return [0] * 64  # Return empty pattern for invalid files
 
-    ticks_per_beat = mid.ticks_per_beat
-    note_ticks = []
-    current_tick = 0
-
-    # Collect all note-on events
-    for track in mid.tracks:
-        for msg in track:
-            current_tick += msg.time
-            if msg.type == 'note_on' and msg.velocity > 0:
-                note_ticks.append(current_tick)
-
     # Calculate steps (64 steps = 2 bars of 16th notes)
-    ticks_per_step = ticks_per_beat / 4  # 16th notes
-    pattern = [0] * 64
-
-    for tick in note_ticks:
-        step = int(tick / ticks_per_step) % 64
-        if 0 <= step < 64:
-            pattern[step] = 1
-
-    return pattern
+    return ticks_to_pattern(note_ticks, ticks_per_beat, 64)
 
 if __name__ == '__main__':
     main()
-    
\ No newline at end of file
@@ -0,0 +1,94 @@
+import struct
+from array import array
+
+# Data bytes that follow each channel status (by high nibble)
+_DATA_LENGTHS = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+def _read_varlen(data, pos):
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, pos
+
+def scan_note_ons(data):
+    """
+    Scan Standard MIDI File bytes for note-on events without building messages.
+
+    Walks the MThd/MTrk chunks directly, following running status, and resets
+    the tick counter at the start of every track (tracks play side by side).
+    Returns (ticks_per_beat, ticks, velocities) where ticks and velocities are
+    parallel arrays of every note-on with a velocity above 0, track by track.
+    Raises ValueError for data that is not a readable MIDI file.
+    """
+    data = memoryview(data)
+    if len(data) < 14 or data[:4] != b'MThd':
+        raise ValueError('not a MIDI file (no MThd header)')
+    header_size, = struct.unpack_from('>I', data, 4)
+    if header_size < 6:
+        raise ValueError('MThd chunk too short')
+    ticks_per_beat, = struct.unpack_from('>H', data, 12)
+    if not ticks_per_beat:
+        raise ValueError('MIDI file has a division of 0 ticks per beat')
+
+    ticks = array('L')
+    velocities = array('B')
+    pos = 8 + header_size
+    end = len(data)
+
+    try:
+        while pos + 8 <= end:
+            name = data[pos:pos + 4]
+            size, = struct.unpack_from('>I', data, pos + 4)
+            pos += 8
+            track_end = pos + size
+            if name != b'MTrk':
+                pos = track_end
+                continue
+            if track_end > end:
+                raise ValueError('MTrk chunk runs past the end of the file')
+
+            tick = 0
+            status = None
+            while pos < track_end:
+                delta, pos = _read_varlen(data, pos)
+                tick += delta
+                byte = data[pos]
+
+                if byte >= 0x80:
+                    pos += 1
+                    if byte == 0xFF:
+                        # Meta event; does not change running status
+                        length, pos = _read_varlen(data, pos + 1)
+                        pos += length
+                        continue
+                    if byte == 0xF0 or byte == 0xF7:
+                        # Sysex; cancels running status
+                        status = None
+                        length, pos = _read_varlen(data, pos)
+                        pos += length
+                        continue
+                    status = byte
+                elif status is None:
+                    raise ValueError('running status without a previous status byte')
+
+                kind = status & 0xF0
+                if kind == 0x90 and data[pos + 1]:
+                    ticks.append(tick)
+                    velocities.append(data[pos + 1])
+                pos += _DATA_LENGTHS.get(kind, 0)
+            pos = track_end
+    except IndexError:
+        raise ValueError('MIDI data ends in the middle of an event') from None
+
+    return ticks_per_beat, ticks, velocities
+
+def ticks_to_pattern(ticks, ticks_per_beat, steps=64):
+    """Quantise note-on ticks to a steps-long 16th note pattern (wrapping around)"""
+    ticks_per_step = ticks_per_beat / 4  # 16th notes
+    pattern = [0] * steps
+    for tick in ticks:
+        pattern[int(tick / ticks_per_step) % steps] = 1
+    return pattern
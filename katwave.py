@@ -1,21 +1,65 @@
+import time
+_process_start = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import json
+import io
 import os
-from PIL import ImageTk, Image
-import pygame
 import sys
 import ctypes
-
-# Import your generation modules
-from gen_chords import generate_chord_progression
-from gen_loop import generate_drum_loop
-
-# Load data
-with open("json-data/drum_patterns.json") as f:
-    drum_data = json.load(f)
-
-from chord_templates import chord_progressions
+import threading
+import queue
+from contextlib import contextmanager
+
+# Generation modules (music21, pydub, numpy), pygame and PIL are imported on
+# first use or by the warm-up thread once the window is on screen
+from datasets import registry
+import stages
+from stages import GenerationCancelled
+
+class StartupTimer:
+    """Collects how long each startup phase takes (python katwave.py --startup-report)"""
+
+    def __init__(self, start):
+        self.start = start
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def since_start(self, name):
+        self.add(name, time.perf_counter() - self.start)
+
+    def report(self):
+        with self._lock:
+            lines = [f"  {name:<32}{seconds * 1000:9.1f} ms" for name, seconds in self.phases]
+        return "Startup report:\n" + "\n".join(lines)
+
+startup = StartupTimer(_process_start)
+startup.since_start("module imports")
+
+_pygame = None
+_audio_lock = threading.Lock()
+
+def audio():
+    """pygame with the mixer initialised, set up on first use"""
+    global _pygame
+    with _audio_lock:
+        if _pygame is None:
+            import pygame
+            pygame.mixer.init()
+            _pygame = pygame
+    return _pygame
 
 class NeonStyle:
     colors = {
@@ -29,6 +73,12 @@ class NeonStyle:
 
 bg = NeonStyle.colors["background"]
 
+# Finished renders kept ready for the current selection
+PRERENDER_POOL_SIZE = 2
+
+# Same keys as gen_loop.INSTRUMENT_FOLDERS (gen_loop is imported lazily)
+DRUM_INSTRUMENTS = ('Kick', 'Snare', 'HiHat', 'OpenHat', 'Clap', 'Percussion')
+
 class MusicGeneratorApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -39,8 +89,6 @@ class MusicGeneratorApp(tk.Tk):
         # # Reapply override and ensure taskbar icon when mapped
         # self.bind("<Map>", lambda e: (self.overrideredirect(True), self._force_taskbar_icon()))
 
-        pygame.mixer.init()
-
         self.app_name = "Katwave"
         self.title(self.app_name)
         self.geometry("900x750")
@@ -48,13 +96,15 @@ class MusicGeneratorApp(tk.Tk):
         self.last_save_path = os.path.expanduser("~")
         self.track_length = 0
         self.is_playing = False
+        # Last generated result, auditioned from memory until SAVE writes it
+        self.current_take = None
+        self.audition_buffer = None
 
-        # Load logo & icons
-        png_logo_path = "assets/images/logo.png"
-        ico_logo_path = "assets/images/logo.ico"
-        self.logo_img = ImageTk.PhotoImage(Image.open(png_logo_path).resize((40, 40)))
-        self.play_icon = ImageTk.PhotoImage(Image.open("assets/images/play.png").resize((24,24)))
-        self.pause_icon = ImageTk.PhotoImage(Image.open("assets/images/pause.png").resize((24,24)))
+        # Logo & icons are decoded once the window is mapped (see _load_icons)
+        self.logo_img = None
+        self.play_icon = None
+        self.pause_icon = None
+        self._deferred_started = False
 
         # # For custom title bar (with min,max close)
         # # Build custom title bar
@@ -62,14 +112,6 @@ class MusicGeneratorApp(tk.Tk):
         # # Ensure window shows on taskbar even with overrideredirect
         # self.after(10, self._force_taskbar_icon)
 
-        try:
-            self.iconphoto(False, self.logo_img)
-
-            # Set taskbar icon (must be .ico file for Windows)
-            # self.iconbitmap(ico_logo_path)
-        except Exception:
-            pass
-
         if sys.platform == "win32":
             # Set app icon for taskbar (Windows)
             myappid = 'katwave.music.generator'  # arbitrary string
@@ -95,12 +137,85 @@ class MusicGeneratorApp(tk.Tk):
         self.body_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=40)
         self.footer_frame = ttk.Frame(self, style='Neon.TFrame')
         self.footer_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=10, padx=40)
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(self, textvariable=self.status_var, font=('Arial', 10),
+                  foreground=NeonStyle.colors['text'], background=bg).pack(side=tk.BOTTOM, fill=tk.X, padx=40)
+
+        # Generation runs on a worker thread; CREATE queues jobs and the worker
+        # posts events back that _poll_generation_events handles on the Tk thread
+        self.generation_jobs = queue.Queue()
+        self.generation_events = queue.Queue()
+        self.current_job = None
+        self.current_stage = None
+        self.queued_jobs = 0
+        threading.Thread(target=self._generation_worker, daemon=True).start()
+
+        # Speculative renders for the current valid selection, so CREATE only has to write
+        self.prerender_lock = threading.Lock()
+        self.prerender_key = None
+        self.prerender_pool = []
+        self.prerender_cancel = threading.Event()
+        self.prerender_failed = None
+        self.prerender_wakeup = threading.Event()
+        threading.Thread(target=self._prerender_worker, daemon=True).start()
 
         # Build UI
         # self.create_header()
         self.create_body()
         self.create_footer()
         self.update_dropdowns()
+        self.after(100, self._poll_generation_events)
+
+        # Finish the heavy setup after the window appears
+        self.bind('<Map>', self._on_first_map)
+        startup.since_start("window built")
+
+    def _on_first_map(self, event):
+        if event.widget is not self or self._deferred_started:
+            return
+        self._deferred_started = True
+        startup.since_start("window mapped")
+        self.after_idle(self._deferred_init)
+
+    def _deferred_init(self):
+        # Tk images have to be created on the main thread
+        with startup.phase("load icons"):
+            self._load_icons()
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    def _load_icons(self):
+        from PIL import ImageTk, Image
+        png_logo_path = "assets/images/logo.png"
+        ico_logo_path = "assets/images/logo.ico"
+        self.logo_img = ImageTk.PhotoImage(Image.open(png_logo_path).resize((40, 40)))
+        self.play_icon = ImageTk.PhotoImage(Image.open("assets/images/play.png").resize((24,24)))
+        self.pause_icon = ImageTk.PhotoImage(Image.open("assets/images/pause.png").resize((24,24)))
+        self.play_btn.config(image=self.play_icon, text='')
+        self.pause_btn.config(image=self.pause_icon, text='')
+
+        try:
+            self.iconphoto(False, self.logo_img)
+
+            # Set taskbar icon (must be .ico file for Windows)
+            # self.iconbitmap(ico_logo_path)
+        except Exception:
+            pass
+
+    def _warm_up(self):
+        """Background thread: import generators, load datasets and start the mixer"""
+        with startup.phase("import gen_loop (bg)"):
+            import gen_loop
+        with startup.phase("import gen_chords (bg)"):
+            import gen_chords
+        with startup.phase("drum patterns (bg)"):
+            registry.drum_patterns()
+        with startup.phase("pygame mixer init (bg)"):
+            try:
+                audio()
+            except Exception as e:
+                print(f"Audio init failed: {e}")
+        if '--startup-report' in sys.argv:
+            print(startup.report())
 
     def _create_title_bar(self):
         title_bar = ttk.Frame(self, style='Neon.TFrame')
@@ -200,12 +315,23 @@ class MusicGeneratorApp(tk.Tk):
                                     font=('Arial', 14, 'bold'), padx=20, pady=10)
         self.create_btn.pack(padx=2, pady=2)
 
+        self.cancel_btn = tk.Button(self.footer_frame, text="CANCEL", command=self.cancel_generation,
+                                    bg=NeonStyle.colors['button_bg'], fg=NeonStyle.colors['text'], bd=0,
+                                    font=('Arial', 10, 'bold'), padx=10, pady=6, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0,20))
+
+        self.save_btn = tk.Button(self.footer_frame, text="SAVE", command=self.handle_save,
+                                  bg=NeonStyle.colors['button_bg'], fg=NeonStyle.colors['text'], bd=0,
+                                  font=('Arial', 10, 'bold'), padx=10, pady=6, state=tk.DISABLED)
+        self.save_btn.pack(side=tk.LEFT, padx=(0,20))
+
         # Playback controls (image-only buttons)
         pb_frame = tk.Frame(self.footer_frame, bg=bg)
         pb_frame.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        self.play_btn = tk.Button(pb_frame, image=self.play_icon, command=self.play_audio, bd=0, bg=bg)
+        # Text stand-ins until _load_icons swaps in the images
+        self.play_btn = tk.Button(pb_frame, text='\u25b6', command=self.play_audio, bd=0, bg=bg, fg=NeonStyle.colors['text'])
         self.play_btn.pack(side=tk.LEFT, padx=5)
-        self.pause_btn = tk.Button(pb_frame, image=self.pause_icon, command=self.pause_audio, bd=0, bg=bg)
+        self.pause_btn = tk.Button(pb_frame, text='\u275a\u275a', command=self.pause_audio, bd=0, bg=bg, fg=NeonStyle.colors['text'])
         self.pause_btn.pack(side=tk.LEFT, padx=5)
 
         # Styled, thinner progress bar
@@ -254,6 +380,31 @@ class MusicGeneratorApp(tk.Tk):
         self.inspired_entry = ttk.Entry(frm, textvariable=self.inspired_var, style='Neon.TEntry')
         self.inspired_entry.pack(fill=tk.X, pady=5, ipady=5)
         self.inspired_var.set("Enter artist name...")
+        self.inspired_var.trace_add('write', self.update_create_btn)
+
+        # Per-instrument lock/re-roll for the loop being auditioned
+        ttk.Label(frm, text="Instruments:", font=('Arial', 12, 'bold'),
+                  foreground=NeonStyle.colors['main'], background=bg).pack(anchor=tk.W)
+        instruments = ttk.Frame(frm, style='Neon.TFrame')
+        instruments.pack(fill=tk.X, pady=5)
+        self.lock_vars = {}
+        self.reroll_btns = []
+        for column, instr in enumerate(DRUM_INSTRUMENTS):
+            cell = ttk.Frame(instruments, style='Neon.TFrame')
+            cell.grid(row=0, column=column, padx=(0,10))
+            tk.Label(cell, text=instr, font=('Arial', 10, 'bold'), bg=bg, fg=NeonStyle.colors['text']).pack()
+            self.lock_vars[instr] = tk.BooleanVar(value=False)
+            tk.Checkbutton(cell, text="Lock", variable=self.lock_vars[instr], command=lambda i=instr: self.toggle_lock(i),
+                           bg=bg, fg=NeonStyle.colors['text'], selectcolor=bg, activebackground=bg, bd=0).pack()
+            btn = tk.Button(cell, text="Re-roll", command=lambda i=instr: self.handle_reroll(i),
+                            bg=NeonStyle.colors['button_bg'], fg=NeonStyle.colors['text'], bd=0, padx=6, state=tk.DISABLED)
+            btn.pack(pady=(2,0))
+            self.reroll_btns.append(btn)
+        btn = tk.Button(instruments, text="RE-ROLL UNLOCKED", command=lambda: self.handle_reroll(None),
+                        bg=NeonStyle.colors['button_bg'], fg=NeonStyle.colors['text'], bd=0,
+                        font=('Arial', 10, 'bold'), padx=10, pady=6, state=tk.DISABLED)
+        btn.grid(row=0, column=len(DRUM_INSTRUMENTS), padx=(10,0))
+        self.reroll_btns.append(btn)
 
         self.genre_var.trace_add('write', self.update_styles)
         self.style_var.trace_add('write', self.update_create_btn)
@@ -266,48 +417,315 @@ class MusicGeneratorApp(tk.Tk):
         self.update_moods()
 
     def handle_create(self):
+        # Snapshot the form so later edits don't change a queued job; the
+        # result is auditioned from memory and only written when SAVE is used
+        mode = self.current_mode.get()
+        key = self._selection_key()
+        job = {
+            'action': 'render',
+            'mode': mode,
+            'key': key,
+            'genre': self.genre_var.get(),
+            'style': self.style_var.get(),
+            'mood': self.mood_var.get(),
+            'inspired_by': self.inspired_var.get(),
+            'label': f"{self.genre_var.get()} {self.style_var.get() if mode=='drums' else self.mood_var.get()}",
+            'cancel': threading.Event(),
+            'prerendered': self._take_prerendered(key)
+        }
+        self.queued_jobs += 1
+        self.generation_jobs.put(job)
+        self._show_generation_status()
+
+    def handle_save(self):
+        take = self.current_take
+        if take is None:
+            return
+        types = [('MIDI files', '*.mid')] if take['mode']=='chords' else [('WAV files','*.wav')]
+        path = filedialog.asksaveasfilename(initialdir=self.last_save_path, filetypes=types, defaultextension=types[0][1])
+        if not path: return
+        self.last_save_path = os.path.dirname(path)
+        job = {
+            'action': 'save',
+            'mode': take['mode'],
+            'take': take,
+            'path': path,
+            'label': os.path.basename(path),
+            'cancel': threading.Event(),
+            'prerendered': None
+        }
+        self.queued_jobs += 1
+        self.generation_jobs.put(job)
+        self._show_generation_status()
+
+    def toggle_lock(self, instr):
+        take = self.current_take
+        if take is not None and take.get('session') is not None:
+            take['session'].set_locked(instr, self.lock_vars[instr].get())
+
+    def handle_reroll(self, instr):
+        """Swap one instrument (or every unlocked one) of the auditioned loop"""
+        take = self.current_take
+        if take is None or take.get('session') is None:
+            return
+        job = {
+            'action': 'reroll',
+            'mode': 'drums',
+            'session': take['session'],
+            'instr': instr,
+            'label': f"re-roll {instr or 'unlocked'}",
+            'cancel': threading.Event(),
+            'prerendered': None
+        }
+        self.queued_jobs += 1
+        self.generation_jobs.put(job)
+        self._show_generation_status()
+
+    def cancel_generation(self):
+        if self.current_job:
+            self.current_job['cancel'].set()
+
+    def _generation_worker(self):
+        """Worker thread: run queued jobs one at a time, never touching Tk directly"""
+        while True:
+            job = self.generation_jobs.get()
+            events = self.generation_events
+            events.put(('start', job, None))
+            reached = []
+            def report(stage, job=job):
+                reached.append(stage)
+                events.put(('stage', job, stage))
+            # Times every stage this job runs; the summary is shown when it finishes
+            progress = stages.StageTimer(report, memory=stages.trace_memory)
+            try:
+                if job['action']=='render':
+                    result = job['prerendered']
+                    if result is None:
+                        result = self._render(job['mode'], job['genre'], job['style'] if job['mode']=='drums' else job['mood'],
+                                              job['inspired_by'], progress, job['cancel'])
+                    session = None
+                    if job['mode']=='drums':
+                        from gen_loop import LoopSession
+                        session = LoopSession(result)
+                    job['result'] = self._take(job['mode'], result, session)
+                elif job['action']=='reroll':
+                    session = job['session']
+                    stages.enter_stage(stages.MIXING, progress, job['cancel'])
+                    if job['instr']:
+                        session.reroll(job['instr'], cancel=job['cancel'])
+                    else:
+                        session.reroll_unlocked(cancel=job['cancel'])
+                    job['result'] = self._take('drums', session.loop, session)
+                elif job['mode']=='chords':
+                    from gen_chords import save_midi
+                    stages.enter_stage(stages.EXPORTING, progress, job['cancel'])
+                    save_midi(job['take']['data'], job['path'])
+                else:
+                    from gen_loop import write_drum_loop
+                    write_drum_loop(job['take']['result'], job['path'], progress=progress, cancel=job['cancel'])
+                progress.finish()
+                events.put(('done', job, progress.summary()))
+            except GenerationCancelled:
+                progress.finish()
+                # Don't leave half-written files behind once writing had started
+                if job['action']=='save' and stages.EXPORTING in reached:
+                    leftovers = [job['path']]
+                    if job['mode']=='drums':
+                        leftovers.append(os.path.splitext(job['path'])[0] + '.zip')
+                    for leftover in leftovers:
+                        try:
+                            os.remove(leftover)
+                        except OSError:
+                            pass
+                events.put(('cancelled', job, None))
+            except Exception as e:
+                progress.finish()
+                events.put(('error', job, e))
+
+    @staticmethod
+    def _take(mode, result, session=None):
+        """Snapshot of a finished render for the Tk thread, built on the worker
+
+        The audio bytes are encoded here, so the Tk thread only hands them to
+        the player. Re-rolls replace session.loop instead of changing it, so
+        'result' stays exactly what was auditioned and is what SAVE writes.
+        """
+        if mode=='drums':
+            from gen_loop import loop_wav_bytes
+            data = loop_wav_bytes(result)
+        else:
+            data = result['data']
+        return {'mode': mode, 'result': result, 'session': session, 'data': data,
+                'duration': result['duration'], 'seed': result['seed']}
+
+    def _render(self, mode, genre, style_or_mood, inspired_by, progress=None, cancel=None):
+        """Render a drum loop or progression in memory (any thread)"""
+        if mode=='chords':
+            from gen_chords import render_chord_progression
+            return render_chord_progression(genre=genre, mood=style_or_mood, progress=progress, cancel=cancel)
+        from gen_loop import render_drum_loop
+        return render_drum_loop(genre=genre, style=style_or_mood, inspired_by=inspired_by,
+                                progress=progress, cancel=cancel)
+
+    def _selection_key(self):
+        """What the next CREATE would render, or None if the form isn't complete"""
+        mode=self.current_mode.get()
+        if mode=='chords' and self.genre_var.get() and self.mood_var.get():
+            return (mode, self.genre_var.get(), self.mood_var.get(), None)
+        if mode=='drums' and self.genre_var.get() and self.style_var.get():
+            return (mode, self.genre_var.get(), self.style_var.get(), self.inspired_var.get())
+        return None
+
+    def _update_prerender(self, key):
+        """Point the pre-render worker at a new selection, dropping stale results"""
+        with self.prerender_lock:
+            if key == self.prerender_key:
+                return
+            self.prerender_key = key
+            # A selection that failed before gets another chance when it comes back
+            self.prerender_failed = None
+            self.prerender_pool = []
+            self.prerender_cancel.set()
+            self.prerender_cancel = threading.Event()
+            self.prerender_wakeup.set()
+
+    def _prerender_succeeded(self, key):
+        """CREATE rendered key, so pre-rendering it can be tried again if it had failed"""
+        with self.prerender_lock:
+            if key is not None and key == self.prerender_failed:
+                self.prerender_failed = None
+                self.prerender_wakeup.set()
+
+    def _take_prerendered(self, key):
+        with self.prerender_lock:
+            if key is None or key != self.prerender_key or not self.prerender_pool:
+                return None
+            result = self.prerender_pool.pop(0)
+            # Top the pool back up
+            self.prerender_wakeup.set()
+            return result
+
+    def _prerender_worker(self):
+        """Worker thread: keep PRERENDER_POOL_SIZE renders ready for the current selection"""
+        while True:
+            self.prerender_wakeup.wait()
+            with self.prerender_lock:
+                key = self.prerender_key
+                cancel = self.prerender_cancel
+                if (key is None or key == self.prerender_failed
+                        or len(self.prerender_pool) >= PRERENDER_POOL_SIZE):
+                    self.prerender_wakeup.clear()
+                    continue
+            try:
+                result = self._render(*key, cancel=cancel)
+            except GenerationCancelled:
+                continue
+            except Exception:
+                # CREATE will surface the error; don't keep retrying this selection
+                with self.prerender_lock:
+                    self.prerender_failed = key
+                continue
+            with self.prerender_lock:
+                if key == self.prerender_key and not cancel.is_set():
+                    self.prerender_pool.append(result)
+
+    def _poll_generation_events(self):
         try:
-            types = [('MIDI files', '*.mid')] if self.current_mode.get()=='chords' else [('WAV files','*.wav')]
-            path = filedialog.asksaveasfilename(initialdir=self.last_save_path, filetypes=types, defaultextension=types[0][1])
-            if not path: return
-            self.last_save_path = os.path.dirname(path)
-            if self.current_mode.get()=='chords':
-                generate_chord_progression(genre=self.genre_var.get(), mood=self.mood_var.get(), output_path=path)
-            else:
-                generate_drum_loop(genre=self.genre_var.get(), style=self.style_var.get(), inspired_by=self.inspired_var.get(), output_path=path)
-            messagebox.showinfo("Success", f"File generated successfully!\n{path}")
-            pygame.mixer.music.load(path)
-            self.track_length = pygame.mixer.Sound(path).get_length()
+            while True:
+                kind, job, value = self.generation_events.get_nowait()
+                if kind=='start':
+                    self.queued_jobs -= 1
+                    self.current_job = job
+                    self.current_stage = 'starting'
+                    self.cancel_btn.config(state=tk.NORMAL)
+                    self._show_generation_status()
+                elif kind=='stage':
+                    self.current_stage = value
+                    self._show_generation_status()
+                else:
+                    self.current_job = None
+                    self.current_stage = None
+                    self.cancel_btn.config(state=tk.DISABLED)
+                    if kind=='done' and job['action']=='render':
+                        prefix = "pre-rendered, " if job['prerendered'] is not None else ""
+                        self.status_var.set(f"Ready to audition: {job['label']}, seed {job['result']['seed']}  ({prefix}{value})")
+                        # A new loop starts with nothing locked
+                        for var in self.lock_vars.values():
+                            var.set(False)
+                        self._load_take(job['result'])
+                        self._prerender_succeeded(job['key'])
+                    elif kind=='done' and job['action']=='reroll':
+                        self.status_var.set(f"Ready to audition: {job['label']}  ({value})")
+                        if self.current_take is not None and self.current_take.get('session') is job['session']:
+                            self._load_take(job['result'])
+                    elif kind=='done':
+                        self.status_var.set(f"Saved {job['path']}  ({value})")
+                    elif kind=='cancelled':
+                        self.status_var.set(f"Cancelled {job['label']}")
+                    else:
+                        self.status_var.set("")
+                        messagebox.showerror("Error", f"Failed to generate file:\n{value}")
+                    if self.queued_jobs:
+                        self._show_generation_status()
+        except queue.Empty:
+            pass
+        self.after(100, self._poll_generation_events)
+
+    def _show_generation_status(self):
+        parts = []
+        if self.current_job:
+            parts.append(f"{self.current_job['label']}: {self.current_stage}...")
+        if self.queued_jobs:
+            parts.append(f"{self.queued_jobs} queued")
+        if parts:
+            self.status_var.set("  |  ".join(parts))
+
+    def _load_take(self, take):
+        """Hand a _take() snapshot to the player from memory; its length comes from the render"""
+        # Saving works even if audio playback is unavailable
+        self.current_take = take
+        self.save_btn.config(state=tk.NORMAL)
+        for btn in self.reroll_btns:
+            btn.config(state=tk.NORMAL if take.get('session') is not None else tk.DISABLED)
+        try:
+            pygame = audio()
+            pygame.mixer.music.stop()
+            # pygame streams from the buffer, so it has to outlive playback
+            self.audition_buffer = io.BytesIO(take['data'])
+            pygame.mixer.music.load(self.audition_buffer, 'wav' if take['mode']=='drums' else 'mid')
+            self.is_playing = False
+            self.track_length = take['duration']
+            self.progress.set(0)
             self.progress.config(to=self.track_length)
             self.play_btn.config(state=tk.NORMAL)
             self.pause_btn.config(state=tk.NORMAL)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate file:\n{e}")
+            messagebox.showerror("Error", f"Failed to load audio:\n{e}")
 
     def play_audio(self):
         if self.track_length == 0:
             messagebox.showwarning("Music not loaded", "music not loaded")
             return
         if not self.is_playing:
-            pygame.mixer.music.play(loops=0, start=self.progress.get())
+            audio().mixer.music.play(loops=0, start=self.progress.get())
             self.is_playing = True
             self.after(200, self.update_progress)
 
     def pause_audio(self):
         if self.is_playing:
-            pygame.mixer.music.pause()
+            audio().mixer.music.pause()
             self.is_playing = False
 
     def update_progress(self):
         if self.is_playing:
-            pos_ms = pygame.mixer.music.get_pos()
+            pos_ms = audio().mixer.music.get_pos()
             if pos_ms >= 0:
                 self.progress.set(pos_ms/1000.0)
             self.after(200, self.update_progress)
 
     def on_seek(self,event):
         if self.is_playing:
-            pygame.mixer.music.play(loops=0,start=self.progress.get())
+            audio().mixer.music.play(loops=0,start=self.progress.get())
 
     def set_mode(self,mode):
         self.current_mode.set(mode)
@@ -326,13 +744,14 @@ class MusicGeneratorApp(tk.Tk):
     def update_dropdowns(self):
         if self.current_mode.get()=='chords':
             self.genre_var.set("")
-            self.genre_combo['values']=list(chord_progressions.keys())
+            self.genre_combo['values']=list(registry.chord_progressions().keys())
         else:
             self.genre_var.set("")
-            self.drums_genre_combo['values']=list(drum_data.keys())
+            self.drums_genre_combo['values']=list(registry.drum_patterns().keys())
 
     def update_moods(self,*args):
         g=self.genre_var.get()
+        chord_progressions=registry.chord_progressions()
         if g in chord_progressions:
             self.mood_combo.config(state='readonly')
             self.mood_combo['values']=list(chord_progressions[g].keys())
@@ -344,6 +763,7 @@ class MusicGeneratorApp(tk.Tk):
 
     def update_styles(self,*args):
         g=self.genre_var.get()
+        drum_data=registry.drum_patterns() if g else {}
         if g in drum_data:
             self.style_combo.config(state='readonly')
             self.style_combo['values']=list(drum_data[g].keys())
@@ -359,6 +779,7 @@ class MusicGeneratorApp(tk.Tk):
         valid=(self.genre_var.get() and ((self.current_mode.get()=='chords' and self.mood_var.get()) or
                (self.current_mode.get()=='drums' and self.style_var.get())))
         self.create_btn.config(state=tk.NORMAL if valid else tk.DISABLED)
+        self._update_prerender(self._selection_key() if valid else None)
 
 if __name__=="__main__":
     app=MusicGeneratorApp()
@@ -0,0 +1,200 @@
+# mixer.py
+import struct
+import numpy as np
+
+# Floor for the mix format, same as AudioSegment.silent() defaults
+DEFAULT_FRAME_RATE = 11025
+DEFAULT_CHANNELS = 1
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+def read_wav(path):
+    """Decode a WAV file into a float32 (frames, channels) array and its frame rate"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise ValueError(f"Not a WAV file: {path}")
+
+    fmt = None
+    pcm = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = struct.unpack('<I', data[pos + 4:pos + 8])[0]
+        body = data[pos + 8:pos + 8 + size]
+        if chunk_id == b'fmt ':
+            fmt = struct.unpack('<HHIIHH', body[:16])
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                # Real format tag is the first two bytes of the SubFormat GUID
+                fmt = (struct.unpack('<H', body[24:26])[0],) + fmt[1:]
+        elif chunk_id == b'data':
+            pcm = body
+        pos += 8 + size + (size & 1)
+
+    if fmt is None or pcm is None:
+        raise ValueError(f"Missing fmt or data chunk in {path}")
+
+    format_tag, channels, frame_rate, _, block_align, bits = fmt
+    width = block_align // channels
+    pcm = pcm[:len(pcm) - len(pcm) % block_align]
+
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and width in (4, 8):
+        samples = np.frombuffer(pcm, dtype='<f4' if width == 4 else '<f8').astype(np.float32)
+    elif format_tag == WAVE_FORMAT_PCM and width == 1:
+        # 8-bit WAV is unsigned
+        samples = (np.frombuffer(pcm, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif format_tag == WAVE_FORMAT_PCM and width == 2:
+        samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32) / 32768
+    elif format_tag == WAVE_FORMAT_PCM and width == 3:
+        raw = np.frombuffer(pcm, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                | (raw[:, 2].astype(np.int8).astype(np.int32) << 16))
+        samples = ints.astype(np.float32) / 8388608
+    elif format_tag == WAVE_FORMAT_PCM and width == 4:
+        samples = (np.frombuffer(pcm, dtype='<i4') / 2147483648).astype(np.float32)
+    else:
+        raise ValueError(f"Unsupported WAV format {format_tag} ({bits}-bit) in {path}")
+
+    return samples.reshape(-1, channels), frame_rate
+
+def wav_info(path):
+    """Read frame rate, channels and duration from a WAV header without loading the audio"""
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            raise ValueError(f"Not a WAV file: {path}")
+
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                break
+            chunk_id = chunk[:4]
+            size = struct.unpack('<I', chunk[4:])[0]
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack('<HHIIHH', f.read(16))
+                f.seek(size - 16 + (size & 1), 1)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    break
+                _, channels, frame_rate, _, block_align, _ = fmt
+                return {
+                    'frame_rate': frame_rate,
+                    'channels': channels,
+                    'duration': (size // block_align) / frame_rate
+                }
+            else:
+                f.seek(size + (size & 1), 1)
+
+    raise ValueError(f"Missing fmt or data chunk in {path}")
+
+def mix_format(decoded):
+    """Pick the output rate/channels for a set of (samples, frame_rate) pairs
+
+    Matches what AudioSegment.overlay did: everything is upsampled to the
+    highest frame rate and channel count involved.
+    """
+    frame_rate = DEFAULT_FRAME_RATE
+    channels = DEFAULT_CHANNELS
+    for samples, rate in decoded:
+        frame_rate = max(frame_rate, rate)
+        channels = max(channels, samples.shape[1])
+    return frame_rate, channels
+
+def conform(samples, frame_rate, target_rate, target_channels):
+    """Convert a decoded sample to the mix frame rate and channel count"""
+    if samples.shape[1] != target_channels:
+        if samples.shape[1] == 1:
+            samples = np.repeat(samples, target_channels, axis=1)
+        else:
+            samples = samples.mean(axis=1, keepdims=True)
+            samples = np.repeat(samples, target_channels, axis=1)
+
+    if frame_rate != target_rate and len(samples):
+        frames = int(round(len(samples) * target_rate / frame_rate))
+        positions = np.arange(frames) * (frame_rate / target_rate)
+        source = np.arange(len(samples))
+        samples = np.stack(
+            [np.interp(positions, source, samples[:, ch]) for ch in range(samples.shape[1])],
+            axis=1
+        )
+
+    return np.ascontiguousarray(samples, dtype=np.float32)
+
+def onset_offsets(onsets, step_duration, frame_rate):
+    """Frame offsets of the given active steps (step_duration in ms)"""
+    return [int(step * step_duration * frame_rate / 1000.0) for step in onsets]
+
+def mix_hits(buffer, sample, offsets):
+    """Add sample into buffer at each frame offset, cut off at the buffer end"""
+    total = len(buffer)
+    for offset in offsets:
+        if offset >= total:
+            continue
+        length = min(len(sample), total - offset)
+        buffer[offset:offset + length] += sample[:length]
+    return buffer
+
+def to_int16(buffer):
+    """Convert a float32 mix buffer to interleaved int16 PCM"""
+    return np.clip(np.round(buffer * 32768), -32768, 32767).astype(np.int16)
+
+def wav_header(frames, frame_rate, channels, sample_width=2):
+    """44-byte PCM WAV header for a known number of frames"""
+    data_size = frames * channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, WAVE_FORMAT_PCM, channels, frame_rate,
+        frame_rate * channels * sample_width, channels * sample_width, sample_width * 8,
+        b'data', data_size
+    )
+
+def write_wav(fileobj, buffer, frame_rate):
+    """Write a float32 mix buffer as 16-bit WAV to any writable file-like object
+
+    Only sequential writes are used, so fileobj does not need to be seekable.
+    """
+    fileobj.write(wav_header(len(buffer), frame_rate, buffer.shape[1]))
+    fileobj.write(to_int16(buffer).tobytes())
+
+def mix_blocks(hits, total_frames, channels, block_frames, tail_frames):
+    """Mix (frame, sample) hits block by block, yielding float32 (frames, channels) blocks
+
+    hits must come in frame order and can be any iterable, so the whole
+    arrangement never has to exist at once; tail_frames is the longest sample.
+    A hit that rings past the end of its block is carried over into the next
+    ones, and everything is cut off at total_frames. Each yielded block is a
+    view that is reused for the next block, so write it out before resuming.
+    """
+    pending = np.zeros((block_frames + tail_frames, channels), dtype=np.float32)
+    hits = iter(hits)
+    hit = next(hits, None)
+    for start in range(0, total_frames, block_frames):
+        end = min(start + block_frames, total_frames)
+        while hit is not None and hit[0] < end:
+            frame, sample = hit
+            length = min(len(sample), total_frames - frame)
+            pending[frame - start:frame - start + length] += sample[:length]
+            hit = next(hits, None)
+        yield pending[:end - start]
+        # Carry what is still ringing to the front for the next block
+        pending[:tail_frames] = pending[block_frames:block_frames + tail_frames]
+        pending[tail_frames:] = 0
+
+def write_wav_stream(fileobj, blocks, frames, frame_rate, channels):
+    """Write float32 blocks as one 16-bit WAV of a known total length
+
+    The header goes first and blocks are appended as they arrive, so memory
+    use does not depend on the length and fileobj does not need to be seekable.
+    """
+    fileobj.write(wav_header(frames, frame_rate, channels))
+    written = 0
+    for block in blocks:
+        fileobj.write(to_int16(block).tobytes())
+        written += len(block)
+    if written != frames:
+        raise ValueError(f"WAV stream has {written} frames, header says {frames}")
+    return written
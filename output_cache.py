@@ -0,0 +1,141 @@
+# output_cache.py
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import threading
+from disk_lru import DiskBudget, scan_dirs
+
+# Bump whenever a change to selection or rendering changes what a given seed produces
+ENGINE_VERSION = 2
+
+DEFAULT_DIR = os.path.join('assets', 'output_cache')
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+META_FILE = 'meta.json'
+
+def new_seed():
+    """A fresh seed for a generation that wasn't given one"""
+    return secrets.randbits(32)
+
+def file_stamp(path):
+    """'size-mtime' of an input file, so outputs made from an older copy aren't reused"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+def output_key(kind, **params):
+    """Content address of one generation: what was asked for, its seed, its inputs and the engine version"""
+    payload = json.dumps({'kind': kind, 'engine': ENGINE_VERSION, **params}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class OutputCache:
+    """Finished outputs on disk, one folder per output_key()
+
+    Generation is deterministic for a seed, so an output that was rendered
+    before is simply copied from here instead of being rendered again.
+    Disabled until enable() gives it a folder; entries are stored whole
+    (written to a temporary folder and renamed into place) and the least
+    recently used ones are dropped once the folder is over max_bytes (see
+    disk_lru.DiskBudget).
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self._lock = threading.Lock()
+        self.directory = None
+        self.max_bytes = max_bytes
+        self._budget = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        if directory:
+            self.enable(directory, max_bytes)
+
+    def enable(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._budget = DiskBudget(directory, max_bytes, scan_dirs)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.directory, key)
+
+    def meta(self, key):
+        """What was stored with key (including its 'files'), or None"""
+        if not self.directory:
+            return None
+        try:
+            with open(os.path.join(self._entry_dir(key), META_FILE), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def fetch(self, key, targets):
+        """Copy a cached output's files to targets ({name: path or writable file})
+
+        Returns what was stored with the output, or None if it isn't cached.
+        """
+        meta = self.meta(key)
+        if meta is None or not set(targets) <= set(meta['files']):
+            with self._lock:
+                self.misses += 1
+            return None
+        entry_dir = self._entry_dir(key)
+        for name, target in targets.items():
+            source = os.path.join(entry_dir, name)
+            if isinstance(target, (str, os.PathLike)):
+                os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+                shutil.copyfile(source, target)
+            else:
+                with open(source, 'rb') as f:
+                    shutil.copyfileobj(f, target)
+        # Mark it as recently used for the eviction
+        try:
+            os.utime(entry_dir)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return meta
+
+    def store(self, key, sources, **meta):
+        """Keep copies of an output's files ({name: path}) under key, with meta saved alongside"""
+        if not self.directory:
+            return
+        entry_dir = self._entry_dir(key)
+        if os.path.isdir(entry_dir):
+            return
+        tmp_dir = f"{entry_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(tmp_dir)
+            size = 0
+            for name, source in sources.items():
+                shutil.copyfile(source, os.path.join(tmp_dir, name))
+                size += os.path.getsize(source)
+            with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+                json.dump({**meta, 'files': sorted(sources)}, f)
+                size += f.tell()
+            os.rename(tmp_dir, entry_dir)
+        except OSError as e:
+            # Most likely another process stored the same output first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(entry_dir):
+                print(f"Could not write output cache entry {entry_dir}: {e}")
+            return
+        with self._lock:
+            self.stores += 1
+        self._budget.add(size)
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'directory': self.directory
+            }
+
+output_cache = OutputCache()
@@ -0,0 +1,143 @@
+# pattern_store.py
+import json
+import os
+import threading
+
+PATTERNS_JSON = os.path.join('json-data', 'drum_patterns.json')
+COMPILED_JSON = os.path.join('json-data', 'drum_patterns.compiled.json')
+STORE_VERSION = 1
+
+# 64 steps = 4 bars of 16th notes, repeated to fill the loop
+STEPS = 64
+
+def expand_pattern(pattern, required_length=STEPS):
+    """Repeat/trim a 0/1 list to required_length steps"""
+    if not pattern:
+        return [0] * required_length
+    repeats = required_length // len(pattern)
+    remainder = required_length % len(pattern)
+    return (pattern * repeats + pattern[:remainder])[:required_length]
+
+def pattern_to_bits(pattern, required_length=STEPS):
+    """Pack a 0/1 step list into an int, bit i set when step i is active"""
+    bits = 0
+    for step, val in enumerate(expand_pattern(pattern, required_length)):
+        if val:
+            bits |= 1 << step
+    return bits
+
+def bits_to_onsets(bits):
+    """Active step indices of a lane bitmask, in order"""
+    onsets = []
+    step = 0
+    while bits:
+        if bits & 1:
+            onsets.append(step)
+        bits >>= 1
+        step += 1
+    return tuple(onsets)
+
+def make_lane(bits, steps=STEPS):
+    return {'bits': bits, 'steps': steps, 'onsets': bits_to_onsets(bits)}
+
+def compile_entry(entry):
+    """Compile one JSON pattern entry; every non-empty 0/1 list becomes a lane"""
+    lanes = {}
+    for key, value in entry.items():
+        if isinstance(value, list) and value:
+            lanes[key] = make_lane(pattern_to_bits(value))
+    return {
+        'pattern_id': entry.get('pattern_id'),
+        'inspired_by': entry.get('inspired_by', ''),
+        'lanes': lanes
+    }
+
+def compile_patterns(data):
+    """Compile the whole {genre: {style: [entry, ...]}} structure"""
+    return {
+        genre: {style: [compile_entry(entry) for entry in entries] for style, entries in styles.items()}
+        for genre, styles in data.items()
+    }
+
+def _dump(compiled, source_mtime):
+    # Lanes are written as [steps, hex bits]; onsets are rebuilt on load
+    return {
+        'version': STORE_VERSION,
+        'source_mtime_ns': source_mtime,
+        'patterns': {
+            genre: {
+                style: [
+                    {
+                        'pattern_id': p['pattern_id'],
+                        'inspired_by': p['inspired_by'],
+                        'lanes': {k: [lane['steps'], format(lane['bits'], 'x')] for k, lane in p['lanes'].items()}
+                    }
+                    for p in entries
+                ]
+                for style, entries in styles.items()
+            }
+            for genre, styles in compiled.items()
+        }
+    }
+
+def _undump(data):
+    return {
+        genre: {
+            style: [
+                {
+                    'pattern_id': p['pattern_id'],
+                    'inspired_by': p['inspired_by'],
+                    'lanes': {k: make_lane(int(bits, 16), steps) for k, (steps, bits) in p['lanes'].items()}
+                }
+                for p in entries
+            ]
+            for style, entries in styles.items()
+        }
+        for genre, styles in data['patterns'].items()
+    }
+
+def load(source=PATTERNS_JSON, compiled_path=COMPILED_JSON):
+    """Load the compiled pattern store, recompiling if the JSON source changed"""
+    source_mtime = os.stat(source).st_mtime_ns
+    try:
+        with open(compiled_path, 'r') as f:
+            data = json.load(f)
+        if data.get('version') == STORE_VERSION and data.get('source_mtime_ns') == source_mtime:
+            return _undump(data)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with open(source, 'r') as f:
+        compiled = compile_patterns(json.load(f))
+    # Unique per process/thread so concurrent writers don't share a temp file
+    tmp_path = f"{compiled_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(_dump(compiled, source_mtime), f, separators=(',', ':'))
+        os.replace(tmp_path, compiled_path)
+    except OSError as e:
+        print(f"Could not write compiled patterns to {compiled_path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return compiled
+
+_patterns = None
+_patterns_lock = threading.Lock()
+
+def get_patterns():
+    """Compiled store shared by the whole process, loaded on first use"""
+    global _patterns
+    with _patterns_lock:
+        if _patterns is None:
+            _patterns = load()
+    return _patterns
+
+def main():
+    compiled = load()
+    total = sum(len(entries) for styles in compiled.values() for entries in styles.values())
+    print(f"Compiled {total} patterns -> {COMPILED_JSON}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# sample_bank.py
+import glob
+import json
+import os
+import threading
+import time
+import numpy as np
+import sample_ingest
+from sample_index import SAMPLES_ROOT, get_index
+
+# One contiguous float32 PCM file plus a JSON index of where each sample lives.
+# Every pack writes a new sample_bank-<id>.pcm named by the index, so a bank
+# that is still memory-mapped is never replaced in place (Windows refuses that).
+BANK_INDEX = os.path.join('assets', 'sample_bank.json')
+BANK_VERSION = 2
+
+def pack(root=SAMPLES_ROOT, index_path=BANK_INDEX):
+    """Pack every indexed sample under root, in canonical format, into one PCM file
+
+    The index maps each sample (relative to root) to its frame offset and
+    frame count, plus the source size/mtime so changed files are noticed.
+    The PCM file gets a new name next to the index, and the index is swapped
+    in at the end; older PCM files are removed unless they are still mapped.
+    """
+    index = get_index()
+    index.build()
+    samples = {}
+    offset = 0
+    folder = os.path.dirname(index_path)
+    pcm_name = f"sample_bank-{time.time_ns():x}.pcm"
+    pcm_path = os.path.join(folder, pcm_name)
+    with open(pcm_path, 'wb') as f:
+        for rel_dir in sorted(index._paths):
+            for path in index._paths[rel_dir]:
+                try:
+                    st = os.stat(path)
+                    data, _ = sample_ingest.load(path)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping unreadable sample {path}: {e}")
+                    continue
+                f.write(np.ascontiguousarray(data, dtype='<f4').tobytes())
+                samples[os.path.relpath(path, root).replace(os.sep, '/')] = {
+                    'offset': offset,
+                    'frames': len(data),
+                    'size': st.st_size,
+                    'mtime_ns': st.st_mtime_ns
+                }
+                offset += len(data)
+
+    bank = {
+        'version': BANK_VERSION,
+        'dtype': '<f4',
+        'frame_rate': sample_ingest.CANONICAL_FRAME_RATE,
+        'channels': sample_ingest.CANONICAL_CHANNELS,
+        'frames': offset,
+        'pcm': pcm_name,
+        'samples': samples
+    }
+    tmp_index = index_path + '.tmp'
+    with open(tmp_index, 'w') as f:
+        json.dump(bank, f, separators=(',', ':'))
+    os.replace(tmp_index, index_path)
+
+    for old in glob.glob(os.path.join(folder, 'sample_bank*.pcm')):
+        if os.path.basename(old) != pcm_name:
+            try:
+                os.remove(old)
+            except OSError:
+                # Still mapped by a running process; the next pack removes it
+                pass
+    return bank
+
+class SampleBank:
+    """Read-only view of a packed bank through numpy.memmap
+
+    Sample data is never copied: lookups return slices of the mapping, so
+    every process that opens the bank shares the same pages of the OS page
+    cache and opening it costs the same however large the library is.
+    """
+
+    def __init__(self, root=SAMPLES_ROOT, index_path=BANK_INDEX):
+        with open(index_path, 'r') as f:
+            bank = json.load(f)
+        if bank.get('version') != BANK_VERSION:
+            raise ValueError(f"Unsupported sample bank version in {index_path}")
+        pcm_path = os.path.join(os.path.dirname(index_path), bank['pcm'])
+        self.root = os.path.abspath(root)
+        self.frame_rate = bank['frame_rate']
+        self.channels = bank['channels']
+        self.samples = bank['samples']
+        if bank['frames']:
+            self.data = np.memmap(pcm_path, dtype=bank['dtype'], mode='r',
+                                  shape=(bank['frames'], self.channels))
+        else:
+            self.data = np.zeros((0, self.channels), dtype=np.float32)
+
+    def lookup(self, path):
+        """(samples, frame_rate) for a source sample path, or None if the bank doesn't have it as it is now"""
+        rel = os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, '/')
+        entry = self.samples.get(rel)
+        if entry is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size != entry['size'] or st.st_mtime_ns != entry['mtime_ns']:
+            return None
+        return self.data[entry['offset']:entry['offset'] + entry['frames']], self.frame_rate
+
+_bank = None
+_bank_stamp = None  # (inode, size, mtime_ns) of the index _bank was opened from
+_bank_lock = threading.Lock()
+
+def get_bank():
+    """The packed bank for assets/drum_samples, or None if it hasn't been packed
+
+    The index is checked on every call, so a bank packed again (by this or
+    another process) is picked up without a restart.
+    """
+    global _bank, _bank_stamp
+    try:
+        st = os.stat(BANK_INDEX)
+        stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+    except OSError:
+        stamp = None
+    with _bank_lock:
+        if stamp != _bank_stamp:
+            _bank_stamp = stamp
+            _bank = None
+            if stamp is not None:
+                try:
+                    _bank = SampleBank()
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Ignoring sample bank: {e}")
+        return _bank
+
+def lookup(path):
+    """Zero-copy (samples, frame_rate) for path from the bank, or None"""
+    bank = get_bank()
+    return bank.lookup(path) if bank else None
+
+def main():
+    bank = pack()
+    size = bank['frames'] * bank['channels'] * 4
+    pcm_path = os.path.join(os.path.dirname(BANK_INDEX), bank['pcm'])
+    print(f"Packed {len(bank['samples'])} samples ({size / (1024 * 1024):.1f} MB) into {pcm_path} with index {BANK_INDEX}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# sample_cache.py
+import os
+import threading
+from collections import OrderedDict
+from multiprocessing import shared_memory
+import numpy as np
+import sample_bank
+import sample_ingest
+
+# Default budget for decoded sample data (float32 arrays)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+class SampleCache:
+    """Process-wide LRU cache of decoded WAV samples keyed by path and mtime
+
+    Samples are loaded from their canonical copies (see sample_ingest.py),
+    so every cached sample is already 44.1 kHz stereo float32. Views into a
+    shared memory block (see put_shared) use no private memory, so they are
+    kept apart from the LRU entries and never count against max_bytes.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self._entries = OrderedDict()  # path -> (mtime_ns, (samples, frame_rate))
+        self._shared = {}              # path -> (mtime_ns, (view, frame_rate))
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    def get(self, path):
+        """Return (samples, frame_rate) for path, loading its canonical copy on a miss"""
+        path = os.path.abspath(path)
+        mtime = os.stat(path).st_mtime_ns
+
+        with self._lock:
+            entry = self._shared.get(path)
+            if entry and entry[0] == mtime:
+                self.hits += 1
+                return entry[1]
+            entry = self._entries.get(path)
+            if entry and entry[0] == mtime:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        return self.put(path, mtime, sample_ingest.load(path))
+
+    def put(self, path, mtime, value):
+        """Store an already decoded (samples, frame_rate) for path as of mtime (ns)"""
+        path = os.path.abspath(path)
+        samples = value[0]
+        # Shared between callers, so nobody gets to mix into it
+        samples.flags.writeable = False
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old:
+                self.bytes -= old[1][0].nbytes
+            self._entries[path] = (mtime, value)
+            self.bytes += samples.nbytes
+            self._evict()
+        return value
+
+    def put_shared(self, path, mtime, value):
+        """Store a (view, frame_rate) into shared memory for path as of mtime (ns), outside the budget"""
+        path = os.path.abspath(path)
+        value[0].flags.writeable = False
+        with self._lock:
+            self._shared[path] = (mtime, value)
+        return value
+
+    def _evict(self):
+        # Drop least recently used entries until we are back under budget
+        while self.bytes > self._max_bytes and self._entries:
+            _, (_, (samples, _)) = self._entries.popitem(last=False)
+            self.bytes -= samples.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._shared.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'shared': len(self._shared),
+                'bytes': self.bytes,
+                'max_bytes': self._max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+sample_cache = SampleCache()
+
+def get_sample(path):
+    """Decoded (samples, frame_rate) for path
+
+    A zero-copy view into the packed sample bank when it has the sample
+    (see sample_bank.py), otherwise from the shared cache.
+    """
+    found = sample_bank.lookup(path)
+    if found is not None:
+        return found
+    return sample_cache.get(path)
+
+def export_shared(paths):
+    """Decode paths once into a shared memory block other processes can attach to
+
+    Returns (shm, index). The owner keeps shm open while workers use it and
+    unlinks it afterwards; index is what attach_shared() needs. Each sample's
+    canonical copy is memory-mapped and copied into the block one at a time,
+    so the owner never holds the decoded library in its own memory.
+    """
+    copies = []
+    for path in paths:
+        path = os.path.abspath(path)
+        mtime = os.stat(path).st_mtime_ns
+        # Only the .npy header is read here; the data is read while copying below
+        samples = np.load(sample_ingest.ingest(path), mmap_mode='r')
+        copies.append((path, mtime, samples.shape, samples.nbytes))
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, sum(nbytes for *_, nbytes in copies)))
+    index = []
+    offset = 0
+    for path, mtime, shape, nbytes in copies:
+        view = np.ndarray(shape, dtype=np.float32, buffer=shm.buf, offset=offset)
+        view[:] = np.load(sample_ingest.ingest(path), mmap_mode='r')
+        index.append((path, mtime, shape, offset, sample_ingest.CANONICAL_FRAME_RATE))
+        offset += nbytes
+    return shm, index
+
+def attach_shared(name, index):
+    """Fill this process's cache with zero-copy views into an export_shared() block"""
+    shm = shared_memory.SharedMemory(name=name)
+    for path, mtime, shape, offset, frame_rate in index:
+        view = np.ndarray(shape, dtype=np.float32, buffer=shm.buf, offset=offset)
+        sample_cache.put_shared(path, mtime, (view, frame_rate))
+    return shm
@@ -0,0 +1,135 @@
+# sample_index.py
+import json
+import os
+import random
+import threading
+import mixer
+
+SAMPLES_ROOT = os.path.join('assets', 'drum_samples')
+INDEX_FILE = 'index.json'
+INDEX_VERSION = 1
+
+class SampleIndex:
+    """On-disk index of the drum sample library
+
+    Stores path, size, mtime, duration, sample rate and channels for every WAV
+    under <root>/<genre>/<folder>. A folder is only rescanned when its own
+    mtime changes (a file is added, removed or renamed), and then only new
+    or modified files have their headers read again. Overwriting a file in
+    place does not change its folder, so its entry stays as it was until
+    the folder changes; sample content is never taken from the index (see
+    sample_ingest and stem_cache.sample_digest, which check size/mtime).
+    """
+
+    def __init__(self, root=SAMPLES_ROOT):
+        self.root = root
+        self.index_path = os.path.join(root, INDEX_FILE)
+        self._dirs = {}   # "<genre>/<folder>" -> {'mtime_ns': int, 'files': {name: info}}
+        self._paths = {}  # "<genre>/<folder>" -> [path, ...] for random picks
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != INDEX_VERSION:
+            return
+        self._dirs = data.get('dirs', {})
+        for rel_dir in self._dirs:
+            self._update_paths(rel_dir)
+
+    def save(self):
+        """Write the index next to the samples if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            # Unique per process/thread so concurrent writers don't share a temp file
+            tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': INDEX_VERSION, 'dirs': self._dirs}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+
+    def _update_paths(self, rel_dir):
+        directory = os.path.join(self.root, *rel_dir.split('/'))
+        self._paths[rel_dir] = [os.path.join(directory, name) for name in sorted(self._dirs[rel_dir]['files'])]
+
+    def refresh(self, genre, folder):
+        """Rescan one folder if it changed since it was indexed, return True if it did"""
+        rel_dir = f"{genre}/{folder}"
+        directory = os.path.join(self.root, genre, folder)
+        try:
+            dir_mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            dir_mtime = None
+
+        with self._lock:
+            entry = self._dirs.get(rel_dir)
+            if entry is not None and entry['mtime_ns'] == dir_mtime:
+                return False
+
+            old_files = entry['files'] if entry else {}
+            files = {}
+            if dir_mtime is not None:
+                with os.scandir(directory) as it:
+                    for item in it:
+                        if not item.name.lower().endswith('.wav') or not item.is_file():
+                            continue
+                        st = item.stat()
+                        info = old_files.get(item.name)
+                        if not info or info['size'] != st.st_size or info['mtime_ns'] != st.st_mtime_ns:
+                            try:
+                                info = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, **mixer.wav_info(item.path)}
+                            except (OSError, ValueError) as e:
+                                print(f"Skipping unreadable sample {item.path}: {e}")
+                                continue
+                        files[item.name] = info
+
+            self._dirs[rel_dir] = {'mtime_ns': dir_mtime, 'files': files}
+            self._update_paths(rel_dir)
+            self._dirty = True
+            return True
+
+    def build(self):
+        """Index (or incrementally update) every <genre>/<folder> under the root"""
+        for genre in sorted(os.listdir(self.root)):
+            genre_dir = os.path.join(self.root, genre)
+            if not os.path.isdir(genre_dir):
+                continue
+            for folder in sorted(os.listdir(genre_dir)):
+                if os.path.isdir(os.path.join(genre_dir, folder)):
+                    self.refresh(genre, folder)
+        self.save()
+
+    def samples(self, genre, folder):
+        """Paths of all indexed samples in a folder"""
+        if self.refresh(genre, folder):
+            self.save()
+        return self._paths.get(f"{genre}/{folder}", [])
+
+    def random_sample(self, genre, folder, rng=random):
+        """A sample from the folder picked with rng (a random.Random), or None if it is empty"""
+        samples = self.samples(genre, folder)
+        return rng.choice(samples) if samples else None
+
+_index = None
+
+def get_index():
+    """Shared index, loaded from disk on first use"""
+    global _index
+    if _index is None:
+        _index = SampleIndex()
+    return _index
+
+def main():
+    index = get_index()
+    index.build()
+    total = sum(len(paths) for paths in index._paths.values())
+    print(f"Indexed {total} samples in {len(index._paths)} folders -> {index.index_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# sample_ingest.py
+import os
+import threading
+import numpy as np
+import mixer
+from sample_index import get_index
+from stem_cache import sample_digest
+
+# Every sample is converted once to the engine's format
+CANONICAL_FRAME_RATE = 44100
+CANONICAL_CHANNELS = 2
+# Anything that rounds to 0 as 16-bit PCM counts as digital silence
+SILENCE_THRESHOLD = 0.5 / 32768
+
+CACHE_DIR = os.path.join('assets', 'canonical_samples')
+
+def canonicalize(samples, frame_rate):
+    """Convert decoded audio to the canonical rate/channels and trim trailing digital silence"""
+    samples = mixer.conform(samples, frame_rate, CANONICAL_FRAME_RATE, CANONICAL_CHANNELS)
+    audible = np.flatnonzero(np.abs(samples).max(axis=1) >= SILENCE_THRESHOLD)
+    end = audible[-1] + 1 if len(audible) else 0
+    return np.ascontiguousarray(samples[:end])
+
+def canonical_path(path, cache_dir=None):
+    """Where the converted copy of a source sample lives, keyed by its content hash"""
+    return os.path.join(cache_dir or CACHE_DIR, f"{sample_digest(path)}-{CANONICAL_FRAME_RATE}-{CANONICAL_CHANNELS}.npy")
+
+def ingest(path, cache_dir=None):
+    """Convert one source WAV if it has no canonical copy yet; returns the copy's path"""
+    target = canonical_path(path, cache_dir)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        samples = canonicalize(*mixer.read_wav(path))
+        # Unique per thread: the GUI's workers can ingest the same sample at once
+        tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, samples)
+            os.replace(tmp_path, target)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            # Another writer got there first
+            if not os.path.exists(target):
+                raise
+    return target
+
+def load(path, cache_dir=None):
+    """(samples, frame_rate) of a source sample, read from its canonical copy"""
+    return np.load(ingest(path, cache_dir)), CANONICAL_FRAME_RATE
+
+def ingest_all(cache_dir=None):
+    """Convert every indexed sample and drop copies no sample refers to anymore"""
+    cache_dir = cache_dir or CACHE_DIR
+    index = get_index()
+    index.build()
+    converted = 0
+    wanted = set()
+    for rel_dir in list(index._paths):
+        for path in index._paths[rel_dir]:
+            target = canonical_path(path, cache_dir)
+            if not os.path.exists(target):
+                try:
+                    ingest(path, cache_dir)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping unreadable sample {path}: {e}")
+                    continue
+                converted += 1
+            wanted.add(os.path.basename(target))
+
+    removed = 0
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.endswith('.npy') and name not in wanted:
+                os.remove(os.path.join(cache_dir, name))
+                removed += 1
+    return {'samples': len(wanted), 'converted': converted, 'removed': removed}
+
+def main():
+    result = ingest_all()
+    print(f"{result['samples']} samples in canonical format ({CANONICAL_FRAME_RATE} Hz, {CANONICAL_CHANNELS} ch, float32): "
+          f"{result['converted']} converted, {result['removed']} stale copies removed -> {CACHE_DIR}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# stages.py
+# Stage reporting shared by gen_loop and gen_chords
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Structured per-stage timing lines (see instrumented) are logged here at INFO
+logger = logging.getLogger('katwave.stages')
+
+# Peak memory per stage needs tracemalloc, which slows generation down noticeably,
+# so it is only measured when asked for (KATWAVE_TRACE_MEMORY=1 or batch --trace-memory)
+trace_memory = os.environ.get('KATWAVE_TRACE_MEMORY') == '1'
+
+# Drum loop stages, in order
+SELECTING = 'selecting'
+DECODING = 'decoding'
+MIXING = 'mixing'
+EXPORTING = 'exporting'
+ZIPPING = 'zipping'
+
+class GenerationCancelled(Exception):
+    """Raised inside a generation when its cancel event has been set"""
+
+def check_cancel(cancel=None):
+    """Stop the generation if cancel (a threading.Event) has been set"""
+    if cancel is not None and cancel.is_set():
+        raise GenerationCancelled()
+
+def enter_stage(name, progress=None, cancel=None):
+    """Check for cancellation, then tell progress(name) a new stage has started"""
+    check_cancel(cancel)
+    if progress:
+        progress(name)
+
+class StageTimer:
+    """progress callback that records how long each stage took and how far memory peaked
+
+    Pass it as progress= (it forwards every stage to the wrapped progress) and
+    call finish() when the generation is over. Each entry of .stages is
+    {'stage', 'seconds', 'peak_mb'}. Only durations are recorded unless
+    memory=True; then peak_mb is how far traced memory rose above its level
+    at the start of the stage. tracemalloc covers the whole process, so
+    that is a diagnostic for one generation at a time: anything running
+    alongside (a pre-render) is counted too. Otherwise peak_mb is None.
+    """
+
+    def __init__(self, progress=None, memory=False):
+        self.progress = progress
+        self.memory = memory
+        self.stages = []
+        self._name = None
+        self._started = None
+        self._base = 0
+        self._tracing = False
+
+    def __call__(self, name):
+        self._close()
+        if self.memory and not self._tracing:
+            _start_tracing()
+            self._tracing = True
+        self._name = name
+        self._started = time.perf_counter()
+        if self._tracing:
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        if self.progress:
+            self.progress(name)
+
+    def _close(self):
+        if self._name is None:
+            return
+        entry = {'stage': self._name, 'seconds': time.perf_counter() - self._started, 'peak_mb': None}
+        if self._tracing:
+            entry['peak_mb'] = max(0, tracemalloc.get_traced_memory()[1] - self._base) / (1024 * 1024)
+        self.stages.append(entry)
+        self._name = None
+
+    def finish(self):
+        """Close the running stage and stop tracing; returns .stages"""
+        self._close()
+        if self._tracing:
+            _stop_tracing()
+            self._tracing = False
+        return self.stages
+
+    def summary(self):
+        """One line for a status bar, e.g. "mixing 42 ms (+3.1 MB), exporting 8 ms" """
+        parts = []
+        for entry in self.stages:
+            part = f"{entry['stage']} {entry['seconds'] * 1000:.0f} ms"
+            if entry['peak_mb']:
+                part += f" (+{entry['peak_mb']:.1f} MB)"
+            parts.append(part)
+        return ", ".join(parts)
+
+# tracemalloc is shared by every running StageTimer
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+def _start_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+def _stop_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+@contextmanager
+def instrumented(progress=None, on_stats=None, **fields):
+    """Time the stages of one generation
+
+    Yields the progress callback to hand down. When on_stats is given or the
+    'katwave.stages' logger has INFO enabled, the stages are timed (with peak
+    memory if trace_memory is set); on success on_stats(stages) is called and
+    a JSON log line with fields is emitted. Otherwise progress is passed
+    through untouched at no cost.
+    """
+    if on_stats is None and not logger.isEnabledFor(logging.INFO):
+        yield progress
+        return
+    timer = StageTimer(progress, memory=trace_memory)
+    try:
+        yield timer
+    finally:
+        timer.finish()
+    if on_stats:
+        on_stats(timer.stages)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({
+            'event': 'generation_stages',
+            **fields,
+            'total_seconds': sum(entry['seconds'] for entry in timer.stages),
+            'stages': timer.stages
+        }))
@@ -0,0 +1,165 @@
+# stem_cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from disk_lru import DiskBudget, scan_files
+
+# Default budgets for rendered stems (float32 arrays)
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 1024 * 1024 * 1024
+
+_digests = {}  # abspath -> (size, mtime_ns, sha1)
+_digests_lock = threading.Lock()
+
+def sample_digest(path):
+    """SHA-1 of a sample file's content, hashed again only when size/mtime change"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    with _digests_lock:
+        entry = _digests.get(path)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    with _digests_lock:
+        _digests[path] = (st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+def stem_key(sample_path, bits, steps, bpm, bars, frame_rate, channels):
+    """Cache key for one instrument stem: sample content, lane, tempo, length and output format"""
+    return f"{sample_digest(sample_path)}-{bits:x}-{steps}-{bpm:g}-{bars}-{frame_rate}-{channels}"
+
+class StemCache:
+    """LRU cache of rendered instrument stems with an optional on-disk tier
+
+    Stems are kept in memory up to max_bytes. With a disk_dir, every stored
+    stem is also written there as .npy (up to disk_max_bytes, oldest used
+    dropped first; see disk_lru.DiskBudget), so other processes and later
+    runs can load it instead of rendering it again.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None, disk_max_bytes=DEFAULT_DISK_MAX_BYTES):
+        self._entries = OrderedDict()  # key -> stem
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_dir = None
+        self.disk_max_bytes = disk_max_bytes
+        self._disk_budget = None
+        if disk_dir:
+            self.enable_disk(disk_dir, disk_max_bytes)
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    def enable_disk(self, directory, max_bytes=DEFAULT_DISK_MAX_BYTES):
+        """Also keep stems as .npy files in directory"""
+        os.makedirs(directory, exist_ok=True)
+        self.disk_dir = directory
+        self.disk_max_bytes = max_bytes
+        self._disk_budget = DiskBudget(directory, max_bytes, lambda d: scan_files(d, '.npy'))
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + '.npy')
+
+    def get(self, key):
+        """The cached stem for key (read-only), or None"""
+        with self._lock:
+            stem = self._entries.get(key)
+            if stem is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return stem
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                stem = np.load(path)
+            except (OSError, ValueError):
+                stem = None
+            if stem is not None:
+                # Mark it as recently used for the disk eviction
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                with self._lock:
+                    self.disk_hits += 1
+                return self._store(key, stem)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, stem):
+        """Store a freshly rendered stem; returns it read-only"""
+        stem = self._store(key, stem)
+        if self.disk_dir:
+            self._write_disk(key, stem)
+        return stem
+
+    def _store(self, key, stem):
+        # Shared between renders, so nobody gets to mix into it
+        stem.flags.writeable = False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._entries[key] = stem
+            self.bytes += stem.nbytes
+            self._evict()
+        return stem
+
+    def _evict(self):
+        # Drop least recently used entries until we are back under budget
+        while self.bytes > self._max_bytes and self._entries:
+            _, stem = self._entries.popitem(last=False)
+            self.bytes -= stem.nbytes
+            self.evictions += 1
+
+    def _write_disk(self, key, stem):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, stem)
+                size = f.tell()
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write stem cache file {path}: {e}")
+            return
+        self._disk_budget.add(size)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self._max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_dir': self.disk_dir
+            }
+
+stem_cache = StemCache()